@@ -0,0 +1,159 @@
+"""End-to-end latency benchmark for ``SniperEngine.snipe_vanity``.
+
+Each run starts the engine's real snipe loop against the local fake Discord
+server, releases the target code at a random point in the poll cycle and
+measures the time from "code released" (server side) to "claim confirmed"
+(the snipe loop returning with a verified claim). Both sides share the
+process' monotonic clock, so the numbers are directly comparable.
+
+Usage::
+
+    python -m bench.benchmark --runs 50 --interval 0.1 --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+
+from bench.fake_discord import FakeDiscord
+from sniper.config import ConfigStore
+from sniper.engine import SniperEngine
+from sniper.httppool import HttpPool
+
+logger = logging.getLogger("VanitySniper.Benchmark")
+
+GUILD_ID = 1000
+OWNER_GUILD_ID = 2000
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of ``values`` (0-100)"""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def make_engine(config):
+    """Headless engine on an in-memory config (never saved)"""
+    return SniperEngine(ConfigStore("benchmark-config.json", config))
+
+
+async def run_once(fake, pool, state_dir, code, args):
+    """Run one release/claim cycle and return the release-to-confirm latency in seconds"""
+    fake.reset()
+    fake.take(code, OWNER_GUILD_ID)
+    fake.schedule_release(code, delay=random.uniform(args.release_min, args.release_max))
+
+    config = {
+        "target_vanity": code,
+        "guild_id": GUILD_ID,
+        "check_interval": args.interval,
+        "notification_channel_id": None,
+        "api_base": fake.base_url,
+    }
+    engine = make_engine(config)
+    engine.http_pool = pool
+    engine.session = pool.session
+    engine.api_base = fake.base_url
+    engine.state_path = os.path.join(state_dir, "vanity_state.json")
+    engine.headers = {
+        "Authorization": "Bot benchmark-token",
+        "Content-Type": "application/json",
+        "User-Agent": "DiscordBot (https://github.com/discord/discord-api-docs, v0.0.0)"
+    }
+    engine.target_vanity = code
+    engine.active = True
+    engine.stats["start_time"] = time.time()
+
+    try:
+        await asyncio.wait_for(engine.snipe_vanity(), timeout=args.timeout)
+    except asyncio.TimeoutError:
+        engine.active = False
+        return None
+    confirmed = time.monotonic()
+    # Let post-claim persistence finish before the state directory goes away
+    await engine.background.drain()
+    await engine.state_store.flush()
+
+    if not engine.successful_snipe or code not in fake.released_at:
+        return None
+    return confirmed - fake.released_at[code]
+
+
+async def run_benchmark(args):
+    fake = FakeDiscord(latency=args.latency, jitter=args.jitter)
+    await fake.start()
+
+    latencies = []
+    failures = 0
+    totals = {"invites": 0, "patch": 0, "verify": 0, "429": 0}
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            pool = HttpPool(fake.base_url)
+            await pool.open()
+            try:
+                for run in range(args.runs):
+                    result = await run_once(fake, pool, state_dir, f"bench{run}", args)
+                    for key, count in fake.requests.items():
+                        totals[key] += count
+                    totals["429"] += fake.responses_429
+                    if result is None:
+                        failures += 1
+                    else:
+                        latencies.append(result)
+            finally:
+                await pool.close()
+    finally:
+        await fake.stop()
+
+    return {
+        "runs": args.runs,
+        "failures": failures,
+        "interval_s": args.interval,
+        "latency_s": args.latency,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000 if latencies else float("nan"),
+        "requests": totals,
+    }
+
+
+def format_report(report):
+    lines = [
+        f"runs={report['runs']} failures={report['failures']} "
+        f"interval={report['interval_s']}s latency={report['latency_s']}s",
+        f"release -> confirmed: p50={report['p50_ms']:.2f}ms p95={report['p95_ms']:.2f}ms "
+        f"p99={report['p99_ms']:.2f}ms max={report['max_ms']:.2f}ms",
+        "requests: " + ", ".join(f"{key}={value}" for key, value in report["requests"].items()),
+    ]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark release-to-claim latency against a local fake Discord")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.1, help="check_interval passed to the sniper")
+    parser.add_argument("--latency", type=float, default=0.01, help="Fake server response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency in seconds")
+    parser.add_argument("--release-min", type=float, default=0.2, help="Earliest release after run start")
+    parser.add_argument("--release-max", type=float, default=0.6, help="Latest release after run start")
+    parser.add_argument("--timeout", type=float, default=15.0, help="Give up on a run after this many seconds")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    report = asyncio.run(run_benchmark(args))
+    print(json.dumps(report, indent=4) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
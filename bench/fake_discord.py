@@ -0,0 +1,329 @@
+"""Local stand-in for the handful of Discord REST routes the sniper uses.
+
+Only the endpoints touched by the sniper are implemented:
+
+    GET   /api/v10/invites/{code}
+    PATCH /api/v10/guilds/{guild_id}/vanity-url
+    GET   /api/v10/guilds/{guild_id}/vanity-url
+    GET   /api/v10/gateway (unauthenticated, used for connection warm-up)
+
+Codes can be scheduled to be released at a given monotonic time, every
+response can be delayed by a configurable latency and every route carries
+real ``X-RateLimit-*`` headers (and ``Retry-After`` on 429s) so the
+sniper's rate-limit handling is exercised the same way as against Discord.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+from aiohttp import web
+
+logger = logging.getLogger("VanitySniper.FakeDiscord")
+
+API_PREFIX = "/api/v10"
+
+
+class RouteLimit:
+    """A fixed-window limit for one rate-limit bucket"""
+
+    def __init__(self, limit, per):
+        self.limit = limit
+        self.per = per
+
+
+class _Bucket:
+    def __init__(self, name, route_limit):
+        self.name = name
+        self.limit = route_limit.limit
+        self.per = route_limit.per
+        self.remaining = self.limit
+        self.window_start = None
+
+    def hit(self, now):
+        """Consume one request, returning the seconds until reset if exhausted"""
+        if self.window_start is None or now - self.window_start >= self.per:
+            self.window_start = now
+            self.remaining = self.limit
+
+        if self.remaining <= 0:
+            return self.reset_after(now)
+
+        self.remaining -= 1
+        return None
+
+    def reset_after(self, now):
+        return max(0.0, self.window_start + self.per - now)
+
+    def headers(self, now):
+        reset_after = self.reset_after(now)
+        return {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": self.name,
+        }
+
+
+class FakeDiscord:
+    """In-process fake of the Discord REST API used by the vanity sniper"""
+
+    def __init__(self, latency=0.0, jitter=0.0, invite_limit=None, patch_limit=None,
+                 verify_limit=None, global_limit=50):
+        self.latency = latency
+        self.jitter = jitter
+        self.invite_limit = invite_limit or RouteLimit(50, 1.0)
+        self.patch_limit = patch_limit or RouteLimit(10, 5.0)
+        self.verify_limit = verify_limit or RouteLimit(10, 5.0)
+        self.global_limit = RouteLimit(global_limit, 1.0)
+
+        # code -> guild_id currently owning it
+        self.taken = {}
+        # guild_id -> vanity code currently set
+        self.vanities = {}
+        # code -> monotonic time at which it is released
+        self.releases = {}
+        # code -> monotonic time at which it was actually released
+        self.released_at = {}
+        # code -> monotonic time at which a claim succeeded
+        self.claimed_at = {}
+
+        self.requests = {"invites": 0, "patch": 0, "verify": 0}
+        self.responses_429 = 0
+        # route name -> statuses to answer with instead of serving the next requests
+        self.faults = {}
+        self._buckets = {}
+        self._global = _Bucket("global", self.global_limit)
+
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.add_routes([
+            web.get(API_PREFIX + "/invites/{code}", self.get_invite),
+            web.patch(API_PREFIX + "/guilds/{guild_id}/vanity-url", self.patch_vanity),
+            web.get(API_PREFIX + "/guilds/{guild_id}/vanity-url", self.get_vanity),
+            web.get(API_PREFIX + "/gateway", self.get_gateway),
+        ])
+        self._runner = None
+        self.base_url = None
+
+    # ------------------------------------------------------------------
+    # Scripting helpers
+    # ------------------------------------------------------------------
+    def take(self, code, guild_id):
+        """Mark ``code`` as owned by ``guild_id``"""
+        code = code.lower()
+        self.taken[code] = guild_id
+        self.vanities[guild_id] = code
+
+    def schedule_release(self, code, at=None, delay=None):
+        """Release ``code`` at monotonic time ``at`` or ``delay`` seconds from now"""
+        if at is None:
+            at = time.monotonic() + (delay or 0.0)
+        self.releases[code.lower()] = at
+        return at
+
+    def inject(self, route, *statuses):
+        """Answer the next requests on ``route`` ("invites", "patch", "verify") with ``statuses``"""
+        self.faults.setdefault(route, []).extend(statuses)
+
+    def reset(self):
+        """Forget all codes, claims, injected faults and rate-limit windows"""
+        self.taken.clear()
+        self.vanities.clear()
+        self.releases.clear()
+        self.released_at.clear()
+        self.claimed_at.clear()
+        self._buckets.clear()
+        self._global = _Bucket("global", self.global_limit)
+        self.requests = {key: 0 for key in self.requests}
+        self.responses_429 = 0
+        self.faults.clear()
+
+    def _apply_releases(self, now):
+        for code, at in list(self.releases.items()):
+            if now >= at:
+                guild_id = self.taken.pop(code, None)
+                if guild_id is not None and self.vanities.get(guild_id) == code:
+                    self.vanities[guild_id] = None
+                self.released_at[code] = at
+                del self.releases[code]
+
+    # ------------------------------------------------------------------
+    # Server plumbing
+    # ------------------------------------------------------------------
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving and return the API base URL"""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}{API_PREFIX}"
+        logger.info(f"Fake Discord listening on {self.base_url}")
+        return self.base_url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _bucket(self, key, route_limit):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(key, route_limit)
+        return bucket
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if request.path == API_PREFIX + "/gateway":
+            # Unauthenticated and not rate limited, used to warm connections
+            return await handler(request)
+
+        if not request.headers.get("Authorization", "").startswith("Bot "):
+            return web.json_response({"message": "401: Unauthorized", "code": 0}, status=401)
+
+        now = time.monotonic()
+        self._apply_releases(now)
+
+        retry_after = self._global.hit(now)
+        if retry_after is not None:
+            return self._too_many(retry_after, is_global=True)
+
+        return await handler(request)
+
+    def _too_many(self, retry_after, bucket=None, is_global=False):
+        self.responses_429 += 1
+        headers = {"Retry-After": f"{retry_after:.3f}"}
+        if is_global:
+            headers["X-RateLimit-Global"] = "true"
+            headers["X-RateLimit-Scope"] = "global"
+        elif bucket is not None:
+            headers.update(bucket.headers(time.monotonic()))
+            headers["X-RateLimit-Scope"] = "user"
+        body = {"message": "You are being rate limited.", "retry_after": retry_after, "global": is_global}
+        return web.json_response(body, status=429, headers=headers)
+
+    def _fault(self, route):
+        """Injected error response for ``route``, if one is queued"""
+        statuses = self.faults.get(route)
+        if not statuses:
+            return None
+        status = statuses.pop(0)
+        return web.json_response({"message": f"{status}: injected", "code": 0}, status=status)
+
+    def _limited(self, key, route_limit):
+        """Return (bucket, 429 response or None) for a request on ``key``"""
+        now = time.monotonic()
+        bucket = self._bucket(key, route_limit)
+        retry_after = bucket.hit(now)
+        if retry_after is not None:
+            return bucket, self._too_many(retry_after, bucket)
+        return bucket, None
+
+    # ------------------------------------------------------------------
+    # Routes
+    # ------------------------------------------------------------------
+    async def get_invite(self, request):
+        self.requests["invites"] += 1
+        fault = self._fault("invites")
+        if fault is not None:
+            return fault
+        bucket, limited = self._limited("invites", self.invite_limit)
+        if limited is not None:
+            return limited
+
+        headers = bucket.headers(time.monotonic())
+        code = request.match_info["code"].lower()
+        guild_id = self.taken.get(code)
+        if guild_id is None:
+            return web.json_response({"message": "Unknown Invite", "code": 10006}, status=404, headers=headers)
+
+        body = {"type": 0, "code": code, "guild": {"id": str(guild_id), "name": f"guild-{guild_id}"}}
+        return web.json_response(body, headers=headers)
+
+    async def patch_vanity(self, request):
+        self.requests["patch"] += 1
+        fault = self._fault("patch")
+        if fault is not None:
+            return fault
+        guild_id = int(request.match_info["guild_id"])
+        bucket, limited = self._limited(f"vanity-patch:{guild_id}", self.patch_limit)
+        if limited is not None:
+            return limited
+
+        headers = bucket.headers(time.monotonic())
+        try:
+            payload = await request.json()
+            code = str(payload["code"]).lower()
+        except Exception:
+            return web.json_response({"message": "Invalid Form Body", "code": 50035}, status=400, headers=headers)
+
+        owner = self.taken.get(code)
+        if owner is not None and owner != guild_id:
+            body = {"message": "Vanity URL is already taken", "code": 50020}
+            return web.json_response(body, status=400, headers=headers)
+
+        previous = self.vanities.get(guild_id)
+        if previous and previous != code:
+            self.taken.pop(previous, None)
+        self.taken[code] = guild_id
+        self.vanities[guild_id] = code
+        self.claimed_at.setdefault(code, time.monotonic())
+        return web.json_response({"code": code, "uses": 0}, headers=headers)
+
+    async def get_vanity(self, request):
+        self.requests["verify"] += 1
+        fault = self._fault("verify")
+        if fault is not None:
+            return fault
+        guild_id = int(request.match_info["guild_id"])
+        bucket, limited = self._limited(f"vanity-get:{guild_id}", self.verify_limit)
+        if limited is not None:
+            return limited
+
+        headers = bucket.headers(time.monotonic())
+        return web.json_response({"code": self.vanities.get(guild_id), "uses": 0}, headers=headers)
+
+    async def get_gateway(self, request):
+        return web.json_response({"url": "wss://gateway.discord.gg"})
+
+
+async def _serve(args):
+    fake = FakeDiscord(latency=args.latency, jitter=args.jitter)
+    for code in args.code:
+        fake.take(code, args.owner)
+        if args.release_after is not None:
+            fake.schedule_release(code, delay=args.release_after)
+    await fake.start(args.host, args.port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake of the Discord vanity endpoints")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to delay every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay added to the latency")
+    parser.add_argument("--code", action="append", default=[], help="Vanity code that starts out taken")
+    parser.add_argument("--owner", type=int, default=1, help="Guild ID that owns the taken codes")
+    parser.add_argument("--release-after", type=float, default=None,
+                        help="Release the taken codes this many seconds after start")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
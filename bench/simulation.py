@@ -0,0 +1,436 @@
+"""Deterministic, virtual-clock simulation of the sniper state machine.
+
+The real ``SniperEngine.snipe_vanity`` loop runs on ``VirtualClockLoop``,
+an asyncio loop whose clock only moves when every task is waiting on a
+timer: instead of blocking, the loop jumps straight to the next deadline.
+Sleeps, ``wait_for`` timeouts, rate-limit waits and backoffs therefore
+take no wall time. What remains is the cost of handling each simulated
+request, so wall time grows with the number of polls: at the default 10
+polls/s an hour of polling takes a few seconds, and a day about two
+minutes.
+
+HTTP goes through a fake session backed by either
+
+* ``SimulatedDiscord`` - a model of the three routes with scripted
+  releases, latency and real rate-limit buckets, or
+* ``TraceReplay`` - responses replayed from a trace recorded with
+  ``sniper.trace.TraceRecorder`` (the ``trace_path`` config key).
+
+Each run reports detection latency, claim latency, request counts and
+429s, so scheduling policies can be compared side by side, e.g. the
+poll floor, or the claim reserve on a tight invite bucket::
+
+    python -m bench.simulation --release-after 3600 \\
+        --policy min_interval=0.1 --policy min_interval=0.5
+    python -m bench.simulation --release-after 3600 --invite-limit 5/5 \\
+        --policy reserve=0 --policy reserve=0.3
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import logging
+import os
+import random
+import selectors
+import tempfile
+import time
+
+from multidict import CIMultiDict
+
+from bench.benchmark import make_engine, GUILD_ID, OWNER_GUILD_ID
+from bench.fake_discord import RouteLimit, _Bucket
+from sniper.trace import load_trace
+
+logger = logging.getLogger("VanitySniper.Simulation")
+
+SIM_API_BASE = "http://simulated/api/v10"
+
+
+# ----------------------------------------------------------------------
+# Virtual clock event loop
+# ----------------------------------------------------------------------
+class _VirtualSelector:
+    """Selector that advances the loop's virtual clock instead of sleeping"""
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self.loop = None
+
+    def select(self, timeout=None):
+        events = self._selector.select(0)
+        if events:
+            return events
+        if timeout is None:
+            # Nothing scheduled; only real I/O (e.g. an executor callback) can wake us
+            return self._selector.select(None)
+        if timeout > 0:
+            self.loop.advance(timeout)
+        return []
+
+    def register(self, fileobj, events, data=None):
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._selector.modify(fileobj, events, data)
+
+    def get_key(self, fileobj):
+        return self._selector.get_key(fileobj)
+
+    def get_map(self):
+        return self._selector.get_map()
+
+    def close(self):
+        self._selector.close()
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Event loop whose ``time()`` is virtual and jumps to the next timer when idle"""
+
+    def __init__(self, start=0.0):
+        self._virtual_time = start
+        selector = _VirtualSelector()
+        super().__init__(selector)
+        selector.loop = self
+
+    def time(self):
+        return self._virtual_time
+
+    def advance(self, seconds):
+        self._virtual_time += seconds
+
+
+# ----------------------------------------------------------------------
+# Fake HTTP session
+# ----------------------------------------------------------------------
+class SimResponse:
+    def __init__(self, status, headers=None, body=None):
+        self.status = status
+        self.headers = CIMultiDict(headers or {})
+        self._body = body
+
+    async def json(self, content_type=None):
+        return self._body
+
+    async def text(self):
+        return json.dumps(self._body)
+
+    async def read(self):
+        return (await self.text()).encode()
+
+
+class _RequestContext:
+    def __init__(self, transport, method, url, headers, data):
+        self.transport = transport
+        self.method = method
+        self.url = url
+        self.headers = headers or {}
+        self.data = data
+
+    async def __aenter__(self):
+        path = self.url[len(SIM_API_BASE):] if self.url.startswith(SIM_API_BASE) else self.url
+        body = json.loads(self.data) if self.data else None
+        return await self.transport.request(self.method, path, self.headers, body)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class SimSession:
+    """Stands in for ``aiohttp.ClientSession`` in the engine"""
+
+    closed = False
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def get(self, url, headers=None, timeout=None):
+        return _RequestContext(self.transport, "GET", url, headers, None)
+
+    def patch(self, url, data=None, headers=None, timeout=None):
+        return _RequestContext(self.transport, "PATCH", url, headers, data)
+
+    async def close(self):
+        pass
+
+
+def classify(method, path):
+    """Trace route name for a request path"""
+    parts = path.strip("/").split("/")
+    if parts[0] == "invites":
+        return "GET /invites/{code}"
+    if parts[0] == "guilds" and parts[-1] == "vanity-url":
+        return f"{method} /guilds/{{guild_id}}/vanity-url"
+    return f"{method} {path}"
+
+
+class _Transport:
+    """Common bookkeeping for simulated transports"""
+
+    def __init__(self, latency, jitter, seed):
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.requests = {}
+        self.responses_429 = 0
+        self.detected_at = {}
+        self.claimed_at = {}
+
+    def clock(self):
+        return asyncio.get_running_loop().time()
+
+    async def _half_trip(self):
+        delay = (self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)) / 2
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _count(self, name, status, code, method):
+        self.requests[name] = self.requests.get(name, 0) + 1
+        now = self.clock()
+        if status == 429:
+            self.responses_429 += 1
+        elif name == "GET /invites/{code}" and status == 404:
+            self.detected_at.setdefault(code, now)
+        elif method == "PATCH" and status == 200:
+            self.claimed_at.setdefault(code, now)
+
+
+class SimulatedDiscord(_Transport):
+    """Model of the vanity routes on the virtual clock"""
+
+    def __init__(self, releases, latency=0.05, jitter=0.0, seed=0, invite_limit=None, patch_limit=None,
+                 verify_limit=None, global_limit=50):
+        super().__init__(latency, jitter, seed)
+        # code -> virtual release time
+        self.releases = {code.lower(): at for code, at in releases.items()}
+        self.taken = {code: OWNER_GUILD_ID for code in self.releases}
+        self.vanities = {}
+        self.limits = {
+            "GET /invites/{code}": invite_limit or RouteLimit(50, 1.0),
+            "PATCH /guilds/{guild_id}/vanity-url": patch_limit or RouteLimit(10, 5.0),
+            "GET /guilds/{guild_id}/vanity-url": verify_limit or RouteLimit(10, 5.0),
+        }
+        self.buckets = {}
+        self.global_bucket = _Bucket("global", RouteLimit(global_limit, 1.0))
+
+    def _apply_releases(self, now):
+        for code, at in list(self.releases.items()):
+            if now >= at:
+                self.taken.pop(code, None)
+                del self.releases[code]
+
+    def _bucket(self, name, major):
+        key = f"{name}:{major}"
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = _Bucket(name, self.limits[name])
+        return bucket
+
+    async def request(self, method, path, headers, body):
+        await self._half_trip()
+        now = self.clock()
+        self._apply_releases(now)
+        name = classify(method, path)
+        parts = path.strip("/").split("/")
+        code = parts[1].lower() if parts[0] == "invites" else (body or {}).get("code")
+
+        if self.global_bucket.hit(now) is not None:
+            status, response_headers, payload = 429, {"Retry-After": "1", "X-RateLimit-Global": "true"}, {}
+        elif name not in self.limits:
+            status, response_headers, payload = 200, {}, {}
+        else:
+            major = parts[1] if parts[0] == "guilds" else None
+            bucket = self._bucket(name, major)
+            retry_after = bucket.hit(now)
+            response_headers = bucket.headers(now)
+            if retry_after is not None:
+                response_headers["Retry-After"] = f"{retry_after:.3f}"
+                status, payload = 429, {"retry_after": retry_after, "global": False}
+            elif parts[0] == "invites":
+                status, payload = (200, {"code": code}) if code in self.taken else (404, {"code": 10006})
+            elif method == "PATCH":
+                guild_id = int(parts[1])
+                owner = self.taken.get(code)
+                if owner is not None and owner != guild_id:
+                    status, payload = 400, {"code": 50020, "message": "Vanity URL is already taken"}
+                else:
+                    self.taken[code] = guild_id
+                    self.vanities[guild_id] = code
+                    status, payload = 200, {"code": code, "uses": 0}
+            else:
+                status, payload = 200, {"code": self.vanities.get(int(parts[1])), "uses": 0}
+
+        self._count(name, status, code, method)
+        await self._half_trip()
+        return SimResponse(status, response_headers, payload)
+
+
+class TraceReplay(_Transport):
+    """Answers each request with the latest recorded response for its route"""
+
+    def __init__(self, entries, latency=0.05, jitter=0.0, seed=0):
+        super().__init__(latency, jitter, seed)
+        self.routes = {}
+        for entry in sorted(entries, key=lambda e: e["t"]):
+            times, recorded = self.routes.setdefault(entry["route"], ([], []))
+            times.append(entry["t"])
+            recorded.append(entry)
+        self.duration = max((e["t"] for e in entries), default=0.0)
+        # The first recorded 404 on the invite route marks the release
+        times, recorded = self.routes.get("GET /invites/{code}", ([], []))
+        self.released_at = next((e["t"] for e in recorded if e["status"] == 404), None)
+
+    async def request(self, method, path, headers, body):
+        await self._half_trip()
+        now = self.clock()
+        name = classify(method, path)
+        parts = path.strip("/").split("/")
+        code = parts[1].lower() if parts[0] == "invites" else (body or {}).get("code")
+
+        times, recorded = self.routes.get(name, ([], []))
+        if recorded:
+            entry = recorded[max(0, bisect.bisect_right(times, now) - 1)]
+            status, response_headers = entry["status"], entry.get("headers", {})
+        else:
+            status, response_headers = 404 if parts[0] == "invites" else 200, {}
+
+        if status == 400:
+            payload = {"code": 50020, "message": "Vanity URL is already taken"}
+        elif method == "PATCH" or parts[-1] == "vanity-url":
+            payload = {"code": code, "uses": 0}
+        else:
+            payload = {"code": code}
+
+        self._count(name, status, code, method)
+        await self._half_trip()
+        return SimResponse(status, response_headers, payload)
+
+
+# ----------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------
+class Policy:
+    """Scheduling knobs compared across simulation runs"""
+
+    def __init__(self, interval=0.5, min_interval=0.1, reserve=0.1):
+        self.interval = interval
+        self.min_interval = min_interval
+        self.reserve = reserve
+
+    @classmethod
+    def parse(cls, text):
+        values = {}
+        for item in filter(None, text.split(",")):
+            key, _, value = item.partition("=")
+            values[key.strip()] = float(value)
+        return cls(**values)
+
+    def __str__(self):
+        return f"interval={self.interval},min_interval={self.min_interval},reserve={self.reserve}"
+
+
+async def _simulate(transport, codes, policy, timeout, state_dir):
+    loop = asyncio.get_running_loop()
+    config = {"guild_id": GUILD_ID, "check_interval": policy.interval, "notification_channel_id": None}
+    engine = make_engine(config)
+    engine.session = SimSession(transport)
+    engine.api_base = SIM_API_BASE
+    engine.state_path = os.path.join(state_dir, "vanity_state.json")
+    engine.headers = {"Authorization": "Bot simulation", "Content-Type": "application/json"}
+    # Everything that reads a clock follows the virtual one
+    engine.rate_limits.clock = loop.time
+    engine.scheduler.clock = loop.time
+    engine.detector.clock = loop.time
+    engine.history.clock = loop.time
+    engine.breakers.clock = loop.time
+    engine.scheduler.min_interval = policy.min_interval
+    engine.scheduler.reserve = policy.reserve
+    for code in codes:
+        engine.watchlist.add(code)
+    engine.active = True
+
+    try:
+        await asyncio.wait_for(engine.snipe_vanity(), timeout)
+    except asyncio.TimeoutError:
+        engine.active = False
+    await engine.background.drain()
+    await engine.state_store.flush()
+    return engine
+
+
+def run_simulation(transport, codes, policy, releases=None, timeout=30 * 86400.0):
+    """Run the snipe loop against ``transport`` on a virtual clock and return a report"""
+    loop = VirtualClockLoop()
+    started = time.perf_counter()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            engine = loop.run_until_complete(_simulate(transport, codes, policy, timeout, state_dir))
+    finally:
+        loop.close()
+    wall = time.perf_counter() - started
+
+    targets = {}
+    for code in codes:
+        code = code.lower()
+        release = (releases or {}).get(code)
+        detected = transport.detected_at.get(code)
+        claimed = transport.claimed_at.get(code)
+        targets[code] = {
+            "released_at": release,
+            "detected_at": detected,
+            "claimed_at": claimed,
+            "detection_latency_s": detected - release if detected is not None and release is not None else None,
+            "claim_latency_s": claimed - release if claimed is not None and release is not None else None,
+        }
+
+    return {
+        "policy": str(policy),
+        "claimed": engine.successful_snipe,
+        "virtual_seconds": loop.time(),
+        "wall_seconds": wall,
+        "requests": dict(transport.requests),
+        "responses_429": transport.responses_429,
+        "targets": targets,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the sniper on a virtual clock")
+    parser.add_argument("--code", action="append", default=[], help="Watched code (default: simcode)")
+    parser.add_argument("--release-after", type=float, default=3600.0,
+                        help="Virtual seconds until the codes are released (SimulatedDiscord)")
+    parser.add_argument("--trace", help="Replay this JSONL trace instead of the simulated server")
+    parser.add_argument("--latency", type=float, default=0.05, help="Round trip time in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--invite-limit", default="50/1", help="Invite bucket as limit/seconds")
+    parser.add_argument("--policy", action="append", default=[],
+                        help="Comma separated interval=,min_interval=,reserve= (repeatable)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    codes = args.code or ["simcode"]
+    limit, _, per = args.invite_limit.partition("/")
+    policies = [Policy.parse(text) for text in args.policy] or [Policy()]
+
+    reports = []
+    for policy in policies:
+        if args.trace:
+            transport = TraceReplay(load_trace(args.trace), args.latency, args.jitter, args.seed)
+            releases = {code.lower(): transport.released_at for code in codes} if transport.released_at else None
+            timeout = transport.duration + 60.0
+        else:
+            releases = {code.lower(): args.release_after for code in codes}
+            transport = SimulatedDiscord(releases, args.latency, args.jitter, args.seed,
+                                         invite_limit=RouteLimit(int(limit), float(per or 1)))
+            timeout = args.release_after + 3600.0
+        reports.append(run_simulation(transport, codes, policy, releases, timeout))
+
+    print(json.dumps(reports, indent=4))
+
+
+if __name__ == "__main__":
+    main()
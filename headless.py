@@ -0,0 +1,164 @@
+"""Headless entry point: the sniper engine without discord.py or a gateway connection.
+
+Only the REST side runs. There is no gateway, so releases are found by
+polling alone, and the preflight checks (which read the gateway cache)
+are skipped. The targets and destination guild come from config.json,
+the saved state and the command line. Claims and errors are logged, and
+also posted to ``notification_webhook_url`` if it is set. Startup time
+and RSS are logged in the same format as bot mode. ``--compare``
+measures both modes' startup in fresh interpreters and prints them side
+by side.
+
+    python headless.py --code mycoolserver --guild-id 123456789012345678
+    python headless.py --compare
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+
+from dotenv import load_dotenv
+
+from sniper.config import ConfigStore, ConfigError, default_config
+from sniper.engine import SniperEngine
+from sniper.logsetup import setup_logging
+from sniper.loopwatch import install_event_loop_policy
+from sniper.startup import timeline
+
+timeline.mark("imports")
+
+logger = logging.getLogger("VanitySniper.Headless")
+
+# What each mode has to import and construct before it can send its first request
+STARTUP_PROBES = {
+    "bot": (
+        "import discord\n"
+        "from discord.ext import commands\n"
+        "import vanitysniper\n"
+        "intents = discord.Intents.default()\n"
+        "intents.message_content = True\n"
+        "intents.members = True\n"
+        "commands.Bot(command_prefix='!', intents=intents)\n"
+    ),
+    "headless": (
+        "from sniper.config import ConfigStore, default_config\n"
+        "from sniper.engine import SniperEngine\n"
+        "SniperEngine(ConfigStore('config.json', default_config()))\n"
+    ),
+}
+_REPORT = (
+    "from sniper.startup import timeline, rss_bytes\n"
+    "import json\n"
+    "print(json.dumps({'startup_ms': timeline.elapsed('ready'), 'rss_bytes': rss_bytes()}))\n"
+)
+
+
+def measure_startup(mode):
+    """Startup of ``mode`` in a fresh interpreter: {"startup_ms", "rss_bytes"}"""
+    code = "from sniper.startup import timeline\n" + STARTUP_PROBES[mode] + "timeline.mark('ready')\n" + _REPORT
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare_modes():
+    """Print bot vs headless startup time and RSS, up to the point each could start polling"""
+    results = {mode: measure_startup(mode) for mode in STARTUP_PROBES}
+    print(f"{'mode':<10}{'startup':>12}{'rss':>12}")
+    for mode, result in results.items():
+        print(f"{mode:<10}{result['startup_ms']:>10.0f}ms{result['rss_bytes'] / 1024 / 1024:>10.1f}MB")
+    print("Bot mode also pays for the gateway login, READY and its member/guild caches, which are not included.")
+    return 0
+
+
+def load_config(path):
+    """Blocking read; called before asyncio.run so it never runs on the event loop"""
+    try:
+        return ConfigStore(path).load()
+    except Exception as e:
+        logger.error(f"Error loading config: {e}")
+        return ConfigStore(path, default_config())
+
+
+async def run(args, config):
+    token = os.getenv("DISCORD_TOKEN")
+    if not token:
+        logger.critical("No token found in .env file! Please add your Discord bot token.")
+        return 1
+
+    try:
+        # Overrides for this run only; they are not written back to the file
+        if args.guild_id is not None:
+            config["guild_id"] = args.guild_id
+        if args.interval is not None:
+            config["check_interval"] = args.interval
+    except ConfigError as e:
+        logger.critical(str(e))
+        return 1
+
+    engine = SniperEngine(config)
+    await engine.open()
+    engine.build_headers(token)
+    for code in args.code:
+        engine.watchlist.add(code)
+    if config.get("watch_config"):
+        config.start_watching()
+    timeline.mark("engine_ready")
+    logger.info(f"Headless startup since process start: {timeline.report()}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    try:
+        if not engine.active_targets():
+            logger.critical("Nothing to snipe: set target_vanity and guild_id in config.json, "
+                            "or pass --code and --guild-id")
+            return 1
+        engine.start()
+        finished = asyncio.create_task(engine.supervisor.wait())
+        stopped = asyncio.create_task(stop.wait())
+        await asyncio.wait({finished, stopped}, return_when=asyncio.FIRST_COMPLETED)
+        stopped.cancel()
+        if stop.is_set():
+            logger.info("Stopping on signal")
+            return 0
+        return 0 if engine.successful_snipe else 1
+    finally:
+        config.stop_watching()
+        await engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the vanity sniper without a Discord gateway connection")
+    parser.add_argument("--config", default="config.json", help="Config file (same format as bot mode)")
+    parser.add_argument("--code", action="append", default=[], help="Vanity code to add to the watchlist")
+    parser.add_argument("--guild-id", type=int, default=None, help="Guild to claim codes for")
+    parser.add_argument("--interval", type=float, default=None, help="Check interval until rate limits are known")
+    parser.add_argument("--compare", action="store_true",
+                        help="Measure startup time and RSS of bot and headless mode, then exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare_modes()
+
+    load_dotenv()
+    setup_logging(
+        level=os.getenv("VANITY_SNIPER_LOG_LEVEL", "INFO").upper(),
+        fmt=os.getenv("VANITY_SNIPER_LOG_FORMAT", "json")
+    )
+    loop_name = install_event_loop_policy()
+    logger.info(f"Using {loop_name} event loop")
+    return asyncio.run(run(args, load_config(args.config)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
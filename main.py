@@ -1,85 +1,90 @@
 import discord
 from discord.ext import commands
 import os
-import json
 import logging
 import asyncio
 from dotenv import load_dotenv
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger("VanitySniper")
+from sniper.logsetup import setup_logging
+from sniper.loopwatch import install_event_loop_policy
+from sniper.config import ConfigStore, default_config
+from sniper.startup import timeline
+
+timeline.mark("imports")
 
 # Load environment variables
 load_dotenv()
 
-# Default config structure
-default_config = {
-    "target_vanity": None,
-    "admin_role_id": None,
-    "notification_channel_id": None,
-    "check_interval": 0.5,  # in seconds
-    "guild_id": None
-}
+# Configure logging: records are formatted and written on a listener thread, off the event loop.
+# VANITY_SNIPER_LOG_FORMAT=text restores the plain text format.
+setup_logging(
+    level=os.getenv("VANITY_SNIPER_LOG_LEVEL", "INFO").upper(),
+    fmt=os.getenv("VANITY_SNIPER_LOG_FORMAT", "json")
+)
+logger = logging.getLogger("VanitySniper")
+
+def load_config():
+    try:
+        # Called before asyncio.run, so this blocking read never runs on the event loop
+        return ConfigStore('config.json').load()
+    except Exception as e:
+        logger.error(f"Error loading config: {e}")
+        return ConfigStore('config.json', default_config())
 
 class VanitySniper(commands.Bot):
-    def __init__(self):
+    def __init__(self, config):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True
         
         super().__init__(command_prefix="!", intents=intents)
-        self.config = self.load_config()
-        
-    def load_config(self):
-        try:
-            if os.path.exists('config.json'):
-                with open('config.json', 'r') as f:
-                    config = json.load(f)
-                    # Update with any missing default fields
-                    for key, value in default_config.items():
-                        if key not in config:
-                            config[key] = value
-                    return config
-            else:
-                # Create default config file
-                with open('config.json', 'w') as f:
-                    json.dump(default_config, f, indent=4)
-                return default_config
-        except Exception as e:
-            logger.error(f"Error loading config: {e}")
-            return default_config
+        # Typed, validated config; changes are pushed to subscribers and written
+        # atomically off the event loop
+        self.config = config
     
     def save_config(self):
-        try:
-            with open('config.json', 'w') as f:
-                json.dump(self.config, f, indent=4)
-            logger.info("Config saved successfully")
-        except Exception as e:
-            logger.error(f"Error saving config: {e}")
+        """Schedule a config write; bursts of changes are coalesced into one write"""
+        self.config.save()
+    
+    async def close(self):
+        # Make sure pending config changes reach the disk before shutting down
+        self.config.stop_watching()
+        await self.config.flush()
+        await super().close()
     
     async def on_ready(self):
+        # Fires again on every reconnect; extensions are loaded once in setup_hook
+        timeline.mark("gateway_ready")
         logger.info(f"Logged in as {self.user} (ID: {self.user.id})")
+        logger.info(f"Bot startup since process start: {timeline.report()}")
         logger.info("------")
+
+    async def setup_hook(self):
+        # Runs once, right after login and before the gateway connects, so the
+        # token is already known and cogs can start working without waiting
+        # for READY
+        timeline.mark("login")
+        if self.config.get("watch_config"):
+            # Pick up edits to config.json without a restart
+            self.config.start_watching()
+        try:
+            filenames = sorted(os.listdir('./cogs'))
+        except FileNotFoundError:
+            logger.error("No ./cogs directory found, no extensions loaded")
+            filenames = []
         
         # Load all cogs
-        for filename in os.listdir('./cogs'):
+        for filename in filenames:
             if filename.endswith('.py'):
                 try:
                     await self.load_extension(f'cogs.{filename[:-3]}')
                     logger.info(f"Loaded extension: {filename}")
                 except Exception as e:
                     logger.error(f"Failed to load extension {filename}: {e}")
+        timeline.mark("extensions_loaded")
 
-    async def setup_hook(self):
-        # Any additional setup can go here
-        pass
-
-async def main():
-    bot = VanitySniper()
+async def main(config):
+    bot = VanitySniper(config)
     token = os.getenv("DISCORD_TOKEN")
     if not token:
         logger.critical("No token found in .env file! Please add your Discord bot token.")
@@ -93,4 +98,6 @@ async def main():
         logger.critical(f"An error occurred: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
+    loop_name = install_event_loop_policy()
+    logger.info(f"Using {loop_name} event loop")
+    asyncio.run(main(load_config()))
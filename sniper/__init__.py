@@ -0,0 +1 @@
+"""Support modules for the vanity sniper cog"""
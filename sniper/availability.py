@@ -0,0 +1,62 @@
+"""Short-lived cache of vanity code availability.
+
+Every availability answer the bot learns, from its own polls or from
+``GUILD_UPDATE`` events, is remembered for a while, so a manual
+``v!checkvanity`` of a code the sniper is already watching is answered
+without spending the invite route's budget. "Available" results expire
+quickly since someone can claim the code at any moment; "taken" results
+are far more stable and live longer.
+"""
+import collections
+import time
+
+from sniper.watchlist import normalize_code
+
+# Seconds a result stays fresh
+DEFAULT_TAKEN_TTL = 60.0
+DEFAULT_AVAILABLE_TTL = 5.0
+
+CacheEntry = collections.namedtuple("CacheEntry", ["available", "checked_at", "source"])
+
+
+class AvailabilityCache:
+    """Availability results keyed by normalized code, with separate TTLs for taken and available"""
+
+    def __init__(self, taken_ttl=DEFAULT_TAKEN_TTL, available_ttl=DEFAULT_AVAILABLE_TTL, clock=time.monotonic):
+        self.taken_ttl = taken_ttl
+        self.available_ttl = available_ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, code, available, source="poll"):
+        """Record a definite result; None (unknown) is never cached"""
+        if not code or available is None:
+            return
+        self._entries[normalize_code(code)] = CacheEntry(bool(available), self.clock(), source)
+
+    def get(self, code):
+        """Return the fresh entry for ``code``, or None if missing or expired"""
+        key = normalize_code(code)
+        entry = self._entries.get(key)
+        if entry is not None:
+            ttl = self.available_ttl if entry.available else self.taken_ttl
+            if self.clock() - entry.checked_at <= ttl:
+                self.hits += 1
+                return entry
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def age(self, entry):
+        return self.clock() - entry.checked_at
+
+    def invalidate(self, code):
+        self._entries.pop(normalize_code(code), None)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,72 @@
+"""Bulk availability checks for ``v!checkvanity``.
+
+Candidate lists are parsed, validated with the same rules as
+``setvanity`` and deduplicated, then checked by a small pool of workers.
+Each check still goes through ``check_vanity_availability``, which waits
+on the invite route's bucket, so the pool only bounds how many requests
+are in flight and never outruns the rate limit.
+"""
+import asyncio
+import logging
+import re
+
+from sniper.watchlist import normalize_code, is_valid_vanity_code
+
+logger = logging.getLogger("VanitySniper.Batch")
+
+# Most codes accepted in one batch, and most bytes read from an attachment
+MAX_BATCH_CODES = 100
+MAX_ATTACHMENT_BYTES = 64 * 1024
+DEFAULT_CONCURRENCY = 4
+# Extra attempts for a code whose check was rate limited or failed
+RETRIES = 2
+
+_SEPARATORS = re.compile(r"[\s,;]+")
+
+
+def parse_codes(text):
+    """Split ``text`` into (valid, invalid) code lists, normalized and deduplicated in order"""
+    valid, invalid, seen = [], [], set()
+    for token in _SEPARATORS.split(text):
+        # Accept pasted invite links as well as bare codes
+        code = normalize_code(token.rsplit("/", 1)[-1])
+        if not code or code in seen:
+            continue
+        seen.add(code)
+        (valid if is_valid_vanity_code(code) else invalid).append(code)
+    return valid, invalid
+
+
+async def check_batch(codes, check, on_result, concurrency=DEFAULT_CONCURRENCY, retries=RETRIES):
+    """Check ``codes`` with at most ``concurrency`` checks in flight.
+
+    ``check(code)`` returns True/False/None like ``check_vanity_availability``;
+    ``on_result(code, result)`` is called as each code finishes.
+    """
+    queue = asyncio.Queue()
+    for code in codes:
+        queue.put_nowait(code)
+
+    async def worker():
+        while True:
+            try:
+                code = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            result = None
+            for _ in range(retries + 1):
+                try:
+                    result = await check(code)
+                except Exception as e:
+                    logger.error(f"Batch check of {code} failed: {e}")
+                    result = None
+                if result is not None:
+                    break
+            on_result(code, result)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(codes))))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
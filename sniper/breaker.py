@@ -0,0 +1,219 @@
+"""Error taxonomy and per-route circuit breakers.
+
+Every REST outcome is sorted into one of a few kinds, and each kind gets
+its own handling:
+
+* ``transient``: timeouts and dropped connections. Retried almost at once,
+  with a short jittered backoff that stays under a second, so a blip never
+  turns into a multi-second blind spot.
+* ``server``: 5xx responses. A run of these opens the route's circuit. No
+  requests go out until a jittered cool-down passes. Then a single
+  half-open probe decides whether to close the circuit again or to reopen
+  it for twice as long.
+* ``fatal``: 401 and 403. Retrying can't fix a bad token or a missing
+  permission, so the route is latched shut until someone intervenes. A 401
+  latches every route, since the token is shared.
+* ``rate_limited`` and ``client``: 429s are paced by ``sniper.ratelimit``.
+  Other 4xx answers mean the server is up, so both leave the circuit alone.
+"""
+import asyncio
+import logging
+import math
+import random
+import time
+
+import aiohttp
+
+logger = logging.getLogger("VanitySniper.Breaker")
+
+OK = "ok"
+TRANSIENT = "transient"
+SERVER = "server"
+RATE_LIMITED = "rate_limited"
+CLIENT = "client"
+FATAL = "fatal"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+LATCHED = "latched"
+
+# Consecutive 5xx responses that open the circuit
+SERVER_ERROR_THRESHOLD = 3
+# Backoff for transient errors: full jitter over base * 2^n, capped well under the old 10s sleep
+TRANSIENT_BASE_DELAY = 0.05
+TRANSIENT_MAX_DELAY = 1.0
+# How long an opened circuit stays open, doubling on each failed probe
+OPEN_BASE_DELAY = 2.0
+OPEN_MAX_DELAY = 60.0
+# A half-open probe whose outcome never arrived (cancelled) is replaced after this long
+PROBE_TIMEOUT = 5.0
+
+_FATAL_REASONS = {
+    401: "the bot token was rejected (401 Unauthorized)",
+    403: "the bot is missing a permission for this route (403 Forbidden)",
+}
+
+
+def classify_status(status):
+    """Kind of outcome an HTTP status represents"""
+    if status in _FATAL_REASONS:
+        return FATAL
+    if status == 429:
+        return RATE_LIMITED
+    if status >= 500:
+        return SERVER
+    if status >= 400 and status != 404:
+        # 404 on the invite route is the answer we poll for, not an error
+        return CLIENT
+    return OK
+
+
+def classify_exception(error):
+    """Kind of outcome a request exception represents"""
+    if isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError, ConnectionError)):
+        return TRANSIENT
+    if isinstance(error, aiohttp.ClientResponseError):
+        return classify_status(error.status)
+    # Anything unexpected is retried like a transient error rather than stopping the sniper
+    return TRANSIENT
+
+
+def fatal_reason(status):
+    return _FATAL_REASONS.get(status, f"HTTP {status}")
+
+
+class CircuitBreaker:
+    """Failure state of one route"""
+
+    def __init__(self, name, clock=time.monotonic):
+        self.name = name
+        self.clock = clock
+        self.state = CLOSED
+        # Consecutive transient and 5xx failures
+        self.transient_failures = 0
+        self.server_failures = 0
+        # Times the circuit opened in a row without a successful probe
+        self.trips = 0
+        self.open_until = 0.0
+        self.retry_at = 0.0
+        self.probe_sent_at = None
+        # HTTP status that latched the route, if any
+        self.fatal_status = None
+        self.last_kind = None
+        self.opened = 0
+
+    def _jitter(self, base, cap, exponent):
+        ceiling = min(cap, base * 2 ** exponent)
+        return random.uniform(base, max(base, ceiling))
+
+    def record(self, kind, status=None):
+        """Fold in one outcome; returns True if it latched the route"""
+        now = self.clock()
+        self.last_kind = kind
+        if self.state == LATCHED:
+            return False
+        if kind == FATAL:
+            self.state = LATCHED
+            self.fatal_status = status
+            return True
+        if kind in (OK, CLIENT, RATE_LIMITED):
+            # The server answered: it is up, whatever it said
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.name} closed again")
+            self.state = CLOSED
+            self.transient_failures = self.server_failures = self.trips = 0
+            self.retry_at = 0.0
+            return False
+        if self.state == HALF_OPEN:
+            self._open(now)
+            return False
+        if kind == SERVER:
+            self.server_failures += 1
+            if self.server_failures >= SERVER_ERROR_THRESHOLD:
+                self._open(now)
+                return False
+        self.transient_failures += 1
+        self.retry_at = now + self._jitter(TRANSIENT_BASE_DELAY, TRANSIENT_MAX_DELAY, self.transient_failures - 1)
+        return False
+
+    def _open(self, now):
+        self.trips += 1
+        self.opened += 1
+        self.state = OPEN
+        self.open_until = now + self._jitter(OPEN_BASE_DELAY, OPEN_MAX_DELAY, self.trips - 1)
+        logger.warning(f"Circuit for {self.name} opened for {self.open_until - now:.1f}s "
+                       f"({self.trips} in a row)")
+
+    def retry_after(self):
+        """Seconds before this route may be used again (inf once latched)"""
+        now = self.clock()
+        if self.state == LATCHED:
+            return math.inf
+        if self.state == OPEN:
+            if now < self.open_until:
+                return self.open_until - now
+            # Cool-down over: let exactly one probe through
+            self.state = HALF_OPEN
+            self.probe_sent_at = now
+            logger.info(f"Circuit for {self.name} half-open, probing")
+            return 0.0
+        if self.state == HALF_OPEN:
+            # Everyone else waits for the probe's outcome
+            if now < self.probe_sent_at + PROBE_TIMEOUT:
+                return self.probe_sent_at + PROBE_TIMEOUT - now
+            self.probe_sent_at = now
+            return 0.0
+        return max(0.0, self.retry_at - now)
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "open_for": max(0.0, self.open_until - self.clock()) if self.state == OPEN else 0.0,
+            "transient_failures": self.transient_failures,
+            "server_failures": self.server_failures,
+            "opened": self.opened,
+            "fatal_status": self.fatal_status,
+        }
+
+
+class CircuitBreakers:
+    """One breaker per route, plus the token-wide latch set by a 401"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._breakers = {}
+        # (route key, status) that latched every route, if any
+        self.token_rejected = None
+
+    def get(self, route):
+        breaker = self._breakers.get(route.key)
+        if breaker is None:
+            breaker = self._breakers[route.key] = CircuitBreaker(route.key, self.clock)
+        return breaker
+
+    def record_status(self, route, status):
+        """Record a response; returns True if it latched the route"""
+        latched = self.get(route).record(classify_status(status), status)
+        if latched and status == 401 and self.token_rejected is None:
+            self.token_rejected = (route.key, status)
+        return latched
+
+    def record_exception(self, route, error):
+        return self.get(route).record(classify_exception(error))
+
+    def retry_after(self, route):
+        if self.token_rejected is not None:
+            return math.inf
+        return self.get(route).retry_after()
+
+    def latched(self, route):
+        return self.token_rejected is not None or self.get(route).state == LATCHED
+
+    def reset(self):
+        """Forget all failures, e.g. after the token or permissions were fixed"""
+        self._breakers.clear()
+        self.token_rejected = None
+
+    def snapshot(self):
+        return {key: breaker.snapshot() for key, breaker in self._breakers.items()}
@@ -0,0 +1,59 @@
+"""Pre-built vanity claim requests.
+
+Everything about the claim PATCH that does not depend on the response is
+fixed once a target is known: the URL, the JSON body and the headers. The
+sniper builds these once per target when sniping starts so the critical
+path between detection and the request hitting the wire does no string
+formatting or JSON serialisation.
+"""
+import json
+
+from sniper.ratelimit import vanity_patch_route
+
+
+class ClaimRequest:
+    """Ready-to-send PATCH for one guild/code pair"""
+
+    __slots__ = ("guild_id", "code", "url", "body", "headers", "route")
+
+    def __init__(self, api_base, guild_id, code, headers):
+        self.guild_id = guild_id
+        self.code = code
+        self.url = f"{api_base}/guilds/{guild_id}/vanity-url"
+        self.body = json.dumps({"code": code}, separators=(",", ":")).encode()
+        self.headers = dict(headers or {})
+        self.headers["Content-Type"] = "application/json"
+        self.route = vanity_patch_route(guild_id)
+
+    def confirms(self, payload):
+        """True if a PATCH response body shows the code is now set"""
+        return isinstance(payload, dict) and payload.get("code") == self.code
+
+
+class ClaimRequestCache:
+    """Claim requests keyed by (guild_id, code), rebuilt when headers or base URL change"""
+
+    def __init__(self):
+        self._requests = {}
+        self._api_base = None
+        self._headers = None
+
+    def clear(self):
+        self._requests.clear()
+
+    def get(self, api_base, guild_id, code, headers):
+        if api_base != self._api_base or headers is not self._headers:
+            self._requests.clear()
+            self._api_base = api_base
+            self._headers = headers
+
+        key = (guild_id, code)
+        request = self._requests.get(key)
+        if request is None:
+            request = self._requests[key] = ClaimRequest(api_base, guild_id, code, headers)
+        return request
+
+    def prepare(self, api_base, targets, headers):
+        """Build requests for every (guild_id, code) pair up front"""
+        for guild_id, code in targets:
+            self.get(api_base, guild_id, code, headers)
@@ -0,0 +1,243 @@
+"""Typed, validated, hot-reloadable bot configuration.
+
+``ConfigStore`` behaves like the plain dict the bot used to keep, so
+``config.get(...)`` and ``config[key] = value`` still work, but known keys
+are coerced to their declared type and validated on every assignment, and
+each change is pushed to subscribers. That lets the running sniper pick
+up a new interval or target immediately. Writes go through ``JsonStore``
+(atomic, debounced, off the loop). An optional watcher polls the file's
+mtime and applies edits made on disk while the bot is running.
+"""
+import asyncio
+import collections.abc
+import logging
+import os
+
+from sniper.persistence import JsonStore, read_json_recovering, write_json_atomic
+
+logger = logging.getLogger("VanitySniper.Config")
+
+# Seconds between mtime checks when watching the file
+WATCH_INTERVAL = 1.0
+# Lowest check interval accepted, matching the sniper's floor
+MIN_CHECK_INTERVAL = 0.1
+
+
+class ConfigError(ValueError):
+    """A config value has the wrong type or is out of range"""
+
+
+class Field:
+    """Declared type, default and validation rule of one config key"""
+
+    def __init__(self, type, default=None, check=None, doc=""):
+        self.type = type
+        self.default = default
+        # Optional predicate the coerced value must satisfy
+        self.check = check
+        self.doc = doc
+
+    def coerce(self, key, value):
+        if value is None:
+            if self.default is not None:
+                raise ConfigError(f"{key} can't be empty")
+            return None
+        try:
+            if self.type is bool and isinstance(value, str):
+                lowered = value.strip().lower()
+                if lowered not in ("true", "false", "1", "0", "yes", "no", "on", "off"):
+                    raise ValueError(value)
+                value = lowered in ("true", "1", "yes", "on")
+            elif self.type is int and isinstance(value, float) and not value.is_integer():
+                raise ValueError(value)
+            else:
+                value = self.type(value)
+        except (TypeError, ValueError):
+            raise ConfigError(f"{key} must be of type {self.type.__name__}, got {value!r}")
+        if self.check is not None and not self.check(value):
+            raise ConfigError(f"{key} has an invalid value: {value!r} ({self.doc})")
+        return value
+
+
+FIELDS = {
+    "target_vanity": Field(str, doc="vanity code to snipe"),
+    "admin_role_id": Field(int),
+    "notification_channel_id": Field(int),
+    "check_interval": Field(float, 0.5, lambda v: v >= MIN_CHECK_INTERVAL,
+                            f"fallback poll interval in seconds, at least {MIN_CHECK_INTERVAL}"),
+    "guild_id": Field(int),
+    "auto_start": Field(bool, False),
+    "metrics_port": Field(int, check=lambda v: 0 < v < 65536, doc="TCP port between 1 and 65535"),
+    "availability_taken_ttl": Field(float, 60.0, lambda v: v >= 0, "seconds, not negative"),
+    "availability_available_ttl": Field(float, 5.0, lambda v: v >= 0, "seconds, not negative"),
+    "history_size": Field(int, check=lambda v: v > 0, doc="number of poll records, positive"),
+    "api_base": Field(str),
+    "trace_path": Field(str),
+    "watch_config": Field(bool, False, doc="reload config.json when it changes on disk"),
+    "notification_webhook_url": Field(str, check=lambda v: "/webhooks/" in v,
+                                      doc="a Discord webhook URL, .../api/webhooks/<id>/<token>"),
+}
+
+
+def default_config():
+    return {key: field.default for key, field in FIELDS.items()}
+
+
+class ConfigStore(collections.abc.MutableMapping):
+    """Dict-like config with typed fields, change subscriptions and persistence"""
+
+    def __init__(self, path, data=None, fields=FIELDS):
+        self.path = path
+        self.fields = fields
+        self._data = {}
+        self._subscribers = []
+        self._watch_task = None
+        self._mtime = None
+        self.reloads = 0
+        # Our own writes update _mtime, so the watcher only reloads edits made by someone else
+        self.store = JsonStore(path, lambda: self._data, indent=4, on_written=self._written)
+        if data is not None:
+            self._data = self.validate(data, fill_defaults=True)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        self.apply({key: value})
+
+    def __delitem__(self, key):
+        if key in self.fields:
+            raise ConfigError(f"{key} is a known setting and can't be removed")
+        del self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"<ConfigStore {self.path} {self._data!r}>"
+
+    def validate(self, data, fill_defaults=False):
+        """Return a coerced copy of ``data``, raising ConfigError on the first bad value"""
+        result = dict(self._data) if not fill_defaults else {}
+        for key, value in data.items():
+            field = self.fields.get(key)
+            # Unknown keys are kept as-is so hand-added settings survive a rewrite
+            result[key] = field.coerce(key, value) if field else value
+        if fill_defaults:
+            for key, field in self.fields.items():
+                result.setdefault(key, field.default)
+        return result
+
+    def apply(self, changes):
+        """Validate and apply ``changes`` atomically, notify subscribers and return the changed keys"""
+        updated = self.validate(changes)
+        changed = {key: (self._data.get(key), value) for key, value in updated.items()
+                   if key not in self._data or self._data[key] != value}
+        if not changed:
+            return {}
+        self._data = updated
+        for keys, callback in list(self._subscribers):
+            relevant = {key: change for key, change in changed.items() if keys is None or key in keys}
+            if not relevant:
+                continue
+            try:
+                callback(relevant)
+            except Exception as e:
+                logger.error(f"Config subscriber {callback!r} failed: {e}")
+        return changed
+
+    def subscribe(self, callback, keys=None):
+        """Call ``callback({key: (old, new)})`` after changes to ``keys`` (all keys if None).
+
+        Returns a function that removes the subscription.
+        """
+        entry = (frozenset(keys) if keys is not None else None, callback)
+        self._subscribers.append(entry)
+        return lambda: self._subscribers.remove(entry) if entry in self._subscribers else None
+
+    def load(self):
+        """Read the file at startup (blocking), creating it with defaults if missing"""
+        data = read_json_recovering(self.path)
+        if data is None:
+            self._data = default_config()
+            write_json_atomic(self.path, self._data, indent=4)
+            self._written()
+            return self
+        self._data = self._load_lenient(data)
+        self._mtime = self._current_mtime()
+        return self
+
+    def _load_lenient(self, data):
+        # At startup a single bad value falls back to its default instead of refusing to run
+        result = {}
+        for key, value in data.items():
+            field = self.fields.get(key)
+            if field is None:
+                result[key] = value
+                continue
+            try:
+                result[key] = field.coerce(key, value)
+            except ConfigError as e:
+                logger.error(f"{e}; using the default {field.default!r}")
+                result[key] = field.default
+        for key, field in self.fields.items():
+            result.setdefault(key, field.default)
+        return result
+
+    def save(self):
+        """Schedule a write; bursts of changes are coalesced into one write"""
+        self.store.schedule()
+
+    async def flush(self):
+        await self.store.flush()
+
+    def _written(self):
+        self._mtime = self._current_mtime()
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    async def reload(self):
+        """Re-read the file and apply whatever changed; invalid values keep their current setting"""
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(None, read_json_recovering, self.path)
+        if data is None:
+            logger.warning(f"{self.path} is missing or unreadable, keeping the current config")
+            return {}
+        valid = {}
+        for key, value in data.items():
+            try:
+                self.validate({key: value})
+                valid[key] = value
+            except ConfigError as e:
+                logger.error(f"Ignoring {key} in {self.path}: {e}")
+        changed = self.apply(valid)
+        self.reloads += 1
+        if changed:
+            logger.info(f"Reloaded {self.path}: {', '.join(sorted(changed))} changed")
+        return changed
+
+    def start_watching(self, interval=WATCH_INTERVAL):
+        """Poll the file's mtime and reload on change"""
+        if self._watch_task is None or self._watch_task.done():
+            self._mtime = self._current_mtime()
+            self._watch_task = asyncio.create_task(self._watch(interval))
+
+    def stop_watching(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+    async def _watch(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            mtime = self._current_mtime()
+            if mtime is not None and mtime != self._mtime:
+                self._mtime = mtime
+                await self.reload()
@@ -0,0 +1,782 @@
+"""The sniper itself, independent of discord.py.
+
+``SniperEngine`` owns everything on the REST side: the HTTP pool and auth
+headers, rate limits, circuit breakers, poll scheduler, watchlist, claim
+path, notification queue and state file. The ``VanitySniper`` cog wraps
+it for bot mode and adds commands, embeds and gateway events.
+``headless.py`` runs it on its own. Anything that needs the gateway is
+passed in as a callable: the cached guilds used for release detection and
+preflight, the claim and error notifications, and the channel sender that
+notifications fall back to without a webhook. Those callables default to
+"no gateway" and to logging (plus the webhook, if one is configured), so
+the engine works without discord.py installed or imported.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+import traceback
+
+from sniper.availability import AvailabilityCache, DEFAULT_TAKEN_TTL, DEFAULT_AVAILABLE_TTL
+from sniper.breaker import CircuitBreakers, fatal_reason, CLOSED
+from sniper.claim import ClaimRequestCache
+from sniper.gateway import ReleaseDetector
+from sniper.history import PollHistory, NO_RESPONSE
+from sniper.httppool import HttpPool
+from sniper.loopwatch import LoopWatchdog
+from sniper.metrics import Metrics, MetricsServer
+from sniper.notify import NotificationDispatcher, CRITICAL, ALERT
+from sniper.persistence import JsonStore
+from sniper.preflight import CapabilityCache
+from sniper.ratelimit import RateLimiter, INVITE_ROUTE, vanity_patch_route, vanity_get_route
+from sniper.scheduler import PollScheduler
+from sniper.startup import timeline
+from sniper.supervisor import Supervisor
+from sniper.tasks import TaskGroup
+from sniper.timesync import ClockSync
+from sniper.trace import TraceRecorder
+from sniper.watchlist import Watchlist
+
+logger = logging.getLogger("VanitySniper.Sniper")
+
+DISCORD_API = "https://discord.com/api/v10"
+# How often to re-check the guild cache while waiting on gateway events
+GATEWAY_RECHECK_INTERVAL = 1.0
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'vanity_state.json')
+
+
+class SniperEngine:
+    """REST polling, claiming and state for a watchlist of vanity codes"""
+
+    def __init__(self, config, guilds=None, get_guild=None, notify_claim=None, notify_error=None,
+                 send_channel=None, state_path=DEFAULT_STATE_PATH):
+        # ConfigStore (or a plain dict) with the bot's settings
+        self.config = config
+        # Cached guilds, for gateway release detection; none without a gateway
+        self.guilds = guilds or (lambda: ())
+        # async notify_claim(code, elapsed_ms, verified, guild_id) and notify_error(reason, route, consequence)
+        self.notify_claim = notify_claim or self.log_claim
+        self.notify_error = notify_error or self.log_error
+        self.active = False
+        # Codes being watched, all sharing one poll budget
+        self.watchlist = Watchlist()
+        self.session = None
+        self.http_pool = None
+        self.headers = None
+        # Set once the HTTP session and auth headers exist
+        self.session_ready = asyncio.Event()
+        self.successful_snipe = False
+        # Guilds that got a vanity from a claimed target; a guild holds only one code.
+        # Rebuilt from the persisted claims, so it survives restarts and v!startsniper
+        self.claimed_guilds = set()
+        self.stats = {
+            "attempts": 0,
+            "errors": 0,
+            "start_time": None
+        }
+        # Hot-path timings and counters, served on /metrics when metrics_port is set
+        self.metrics = Metrics()
+        self.metrics_server = None
+        # Measures event loop scheduling lag and names the callback behind stalls
+        self.watchdog = LoopWatchdog(metrics=self.metrics)
+        # Offset between Discord's clock and ours, from Date headers
+        self.clock_sync = ClockSync()
+        # Per-route rate limit tracking
+        self.rate_limits = RateLimiter(metrics=self.metrics, clock_sync=self.clock_sync)
+        # Per-route error handling: fast retries, open circuits on outages, latches on 401/403
+        self.breakers = CircuitBreakers()
+        # Vanity feature, boost tier and Manage Server per destination guild, from the gateway cache
+        self.capabilities = CapabilityCache(get_guild or (lambda guild_id: None))
+        self.auto_restart = True
+        self.min_check_interval = 0.1  # Minimum time between checks in seconds
+        # Paces availability polls from the invite bucket's remaining budget
+        self.scheduler = PollScheduler(self.rate_limits, INVITE_ROUTE, min_interval=self.min_check_interval,
+                                       metrics=self.metrics)
+        # Optional response trace for offline replay (trace_path in config)
+        self.trace = None
+        # Detects releases pushed over the gateway for guilds the bot is in
+        self.detector = ReleaseDetector()
+        # Recent availability answers, so manual checks don't spend the poll budget
+        self.availability = AvailabilityCache()
+        self.unsubscribe_config = None
+        # Fixed-size record of every REST response, for v!history and export
+        self.history = PollHistory()
+        # Pre-built claim PATCH requests per target
+        self.claim_requests = ClaimRequestCache()
+        # Post-claim work (notifications, state writes) that must not block the loop
+        self.background = TaskGroup()
+        # Prioritised notification queue, delivered via the webhook or send_channel(payload)
+        self.notifier = NotificationDispatcher(session=lambda: self.session, send_channel=send_channel,
+                                               clock_sync=self.clock_sync)
+        # Sole owner of the snipe task; restarts it with backoff when it crashes
+        self.supervisor = Supervisor(self.snipe_vanity, should_restart=lambda: self.active and self.auto_restart)
+        # REST base URL (overridable for local benchmarks)
+        self.api_base = DISCORD_API
+        # Debounced, atomic state file writer
+        self.state_store = JsonStore(state_path, self.state_snapshot)
+
+    @property
+    def state_path(self):
+        return self.state_store.path
+
+    @state_path.setter
+    def state_path(self, path):
+        self.state_store.path = path
+
+    @property
+    def target_vanity(self):
+        """Highest priority unclaimed code on the watchlist"""
+        target = self.watchlist.primary()
+        return target.code if target else None
+
+    @target_vanity.setter
+    def target_vanity(self, vanity_code):
+        # Setting a single target replaces the whole watchlist
+        self.watchlist.clear()
+        if vanity_code:
+            self.watchlist.add(vanity_code)
+
+    async def open(self):
+        """Open the HTTP pool, apply the config, load the saved state and start watching config changes"""
+        config = self.config
+        self.api_base = config.get("api_base") or DISCORD_API
+
+        # Tuned connection pool, kept warm in the background
+        self.http_pool = HttpPool(self.api_base)
+        self.session = await self.http_pool.open()
+        self.http_pool.start_keepalive()
+
+        self.notifier.set_webhook(config.get("notification_webhook_url"))
+        self.notifier.start()
+
+        # Event loop lag watchdog and metrics endpoint
+        self.watchdog.start()
+        if config.get("trace_path"):
+            self.trace = TraceRecorder(config["trace_path"])
+        if config.get("metrics_port"):
+            self.register_metric_gauges()
+            self.metrics_server = MetricsServer(self.metrics, port=config["metrics_port"])
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.error(f"Failed to start metrics server: {e}")
+                self.metrics_server = None
+        if config.get("target_vanity"):
+            self.target_vanity = config["target_vanity"]
+        if config.get("history_size"):
+            self.history = PollHistory(config["history_size"])
+        self.availability.taken_ttl = config.get("availability_taken_ttl", DEFAULT_TAKEN_TTL)
+        self.availability.available_ttl = config.get("availability_available_ttl", DEFAULT_AVAILABLE_TTL)
+
+        # Load state from backup if it exists
+        await self.load_state()
+
+        # Apply config changes (commands, or edits to config.json) to the running sniper
+        if hasattr(config, "subscribe"):
+            self.unsubscribe_config = config.subscribe(self.on_config_changed)
+
+    async def close(self):
+        """Stop sniping, let background work finish and release the HTTP pool"""
+        if self.unsubscribe_config:
+            self.unsubscribe_config()
+        await self.supervisor.stop()
+
+        # Give an in-flight success notification a moment to go out
+        await self.background.drain(timeout=5)
+        await self.notifier.close(timeout=5)
+
+        self.watchdog.stop()
+
+        if self.metrics_server:
+            await self.metrics_server.stop()
+
+        # Save state before shutting down
+        await self.save_state(immediate=True)
+        if self.trace:
+            await self.trace.flush()
+
+        if self.http_pool:
+            await self.http_pool.close()
+        elif self.session:
+            await self.session.close()
+
+    def build_headers(self, token):
+        """Set up the headers with the bot token for API requests"""
+        self.headers = {
+            "Authorization": f"Bot {token}",
+            "Content-Type": "application/json",
+            "User-Agent": "DiscordBot (https://github.com/discord/discord-api-docs, v0.0.0)"
+        }
+        if self.session is not None:
+            self.session_ready.set()
+            timeline.mark("session_ready")
+
+    def start(self, reset_stats=True):
+        """Start the supervised snipe task; returns False if one is already running"""
+        if reset_stats:
+            self.stats = {
+                "attempts": 0,
+                "errors": 0,
+                "start_time": time.time()
+            }
+        self.active = True
+        self.successful_snipe = False
+        return self.supervisor.start()
+
+    async def stop(self):
+        self.active = False
+        await self.supervisor.stop()
+
+    def on_config_changed(self, changes):
+        """Push config changes into the running sniper without restarting it"""
+        if "check_interval" in changes:
+            self.scheduler.fallback_interval = changes["check_interval"][1]
+            # Re-plan the current wait from the last poll, keeping our place in the window
+            self.scheduler.reschedule()
+        if "target_vanity" in changes:
+            code = changes["target_vanity"][1]
+            if code and code != self.target_vanity:
+                self.target_vanity = code
+                self.refresh_targets()
+        if "guild_id" in changes:
+            self.refresh_targets()
+        if "availability_taken_ttl" in changes:
+            self.availability.taken_ttl = changes["availability_taken_ttl"][1]
+        if "availability_available_ttl" in changes:
+            self.availability.available_ttl = changes["availability_available_ttl"][1]
+        if "notification_webhook_url" in changes:
+            self.notifier.set_webhook(changes["notification_webhook_url"][1])
+        logger.info(f"Applied config changes: {', '.join(sorted(changes))}")
+
+    def claim_guild(self, target):
+        """Guild a target is claimed for: its own, else the configured default"""
+        return target.guild_id or self.config.get("guild_id")
+
+    def claimable(self, guild_id):
+        """Whether a claim for ``guild_id`` could succeed right now.
+
+        Guilds that already got a vanity from a claimed target, guilds failing preflight
+        and guilds where a claim was refused with 401/403 (until the sniper is restarted)
+        are excluded.
+        """
+        return (bool(guild_id) and guild_id not in self.claimed_guilds
+                and not self.capabilities.blocked(guild_id)
+                and not self.breakers.latched(vanity_patch_route(guild_id)))
+
+    def active_targets(self):
+        """Pending targets whose destination guild is claimable"""
+        return [target for target in self.watchlist.pending() if self.claimable(self.claim_guild(target))]
+
+    def destination_guilds(self):
+        """Every guild a pending target would be claimed for"""
+        return {self.claim_guild(target) for target in self.watchlist.pending()} - {None}
+
+    def sync_claimed_guilds(self):
+        """Rebuild ``claimed_guilds`` from the watchlist's claimed targets"""
+        self.claimed_guilds = {target.claimed_guild_id or self.claim_guild(target)
+                               for target in self.watchlist if target.claimed} - {None}
+
+    def refresh_targets(self):
+        """Point release detection and the prepared claims at the current watchlist"""
+        # Removing a claimed target (v!removetarget) frees its guild for another code
+        self.sync_claimed_guilds()
+        targets = self.active_targets()
+        self.detector.watch(target.code for target in targets)
+        if self.headers is not None:
+            self.claim_requests.prepare(self.api_base, [(self.claim_guild(t), t.code) for t in targets], self.headers)
+
+    def register_metric_gauges(self):
+        """Expose sniper and connection pool state as gauges"""
+        self.metrics.add_gauge("vanity_sniper_active", "Whether the sniper is running", lambda: int(self.active))
+        self.metrics.add_gauge("vanity_sniper_watched_targets", "Unclaimed codes on the watchlist",
+                               lambda: len(self.watchlist.pending()))
+        self.metrics.add_gauge("vanity_sniper_claim_attempts", "Claim attempts since the sniper started",
+                               lambda: self.stats["attempts"])
+        self.metrics.add_gauge("vanity_sniper_task_restarts", "Times the supervisor restarted the snipe task",
+                               lambda: self.supervisor.restarts)
+        self.metrics.add_gauge("vanity_sniper_availability_cache_hits", "Availability checks answered from the cache",
+                               lambda: self.availability.hits)
+        self.metrics.add_gauge("vanity_sniper_clock_offset_seconds", "Estimated Discord clock minus local clock",
+                               lambda: self.clock_sync.offset)
+        self.metrics.add_gauge("vanity_sniper_clock_offset_uncertainty_seconds", "Half-width of the clock offset estimate",
+                               lambda: self.clock_sync.uncertainty)
+        self.metrics.add_gauge("vanity_sniper_open_circuits", "Routes whose circuit is open, half-open or latched",
+                               lambda: sum(info["state"] != CLOSED for info in self.breakers.snapshot().values()))
+        self.metrics.add_gauge("vanity_sniper_paced_interval_seconds", "Current poll interval",
+                               lambda: self.scheduler.last_interval)
+        if self.http_pool:
+            for key in ("open", "idle", "reused", "created"):
+                self.metrics.add_gauge(f"vanity_sniper_pool_{key}_connections", f"Connection pool {key} count",
+                                       lambda key=key: self.http_pool.stats()[key])
+
+    def state_snapshot(self):
+        """The state persisted to the backup file"""
+        return {
+            "active": self.active,
+            "target_vanity": self.target_vanity,
+            "watchlist": self.watchlist.to_list(),
+            "stats": dict(self.stats),
+            "auto_restart": self.auto_restart
+        }
+
+    async def save_state(self, immediate=False):
+        """Save the current state to a backup file.
+
+        Writes are debounced and happen off the event loop; pass ``immediate``
+        to wait for the write (e.g. before unloading).
+        """
+        self.state_store.schedule()
+        if immediate:
+            await self.state_store.flush()
+
+    async def load_state(self):
+        """Load state from backup file if it exists"""
+        try:
+            loop = asyncio.get_running_loop()
+            state = await loop.run_in_executor(None, self.state_store.load)
+
+            if state is None:
+                logger.info("No state backup found, using default settings")
+                return
+
+            # Restore state
+            if state.get("watchlist"):
+                self.watchlist.load(state["watchlist"])
+            elif state.get("target_vanity"):
+                self.target_vanity = state["target_vanity"]
+            self.sync_claimed_guilds()
+            self.auto_restart = state.get("auto_restart", True)
+
+            # Only set active if auto_restart is enabled
+            if state.get("active", False) and self.auto_restart:
+                self.active = True
+
+            logger.info(f"Successfully loaded vanity sniper state: targets={len(self.watchlist)}, active={self.active}")
+        except Exception as e:
+            logger.error(f"Failed to load state: {e}")
+
+    async def log_claim(self, vanity_code, elapsed_ms, verified=None, guild_id=None):
+        """Default claim notification: a log line once the claim is confirmed, and the webhook if set"""
+        if verified is not None and not await verified:
+            return
+        logger.info(f"Claimed vanity {vanity_code} for guild {guild_id} in {elapsed_ms:.2f}ms")
+        self.notifier.post({
+            "content": "@everyone",
+            "embeds": [{
+                "title": "✅ Vanity URL Sniped!",
+                "description": f"Successfully sniped the vanity URL: `{vanity_code}` for server `{guild_id}` "
+                               f"in {elapsed_ms:.2f}ms",
+                "color": 0x2ECC71,
+            }],
+        }, CRITICAL)
+
+    async def log_error(self, reason, route, consequence):
+        """Default error notification: a log line, and the webhook if set"""
+        logger.critical(f"{reason}{f' on {route.key}' if route else ''}. {consequence}")
+        self.notifier.post({
+            "embeds": [{"title": "⛔ Vanity Sniper Error", "description": f"{reason}.\n{consequence}",
+                        "color": 0xE74C3C}],
+        }, ALERT, key=f"error-{route.key}" if route else None)
+
+    async def check_vanity_availability(self, vanity_code):
+        """Check if a vanity URL is available using the Public Invites API"""
+        start_time = None
+        try:
+            # Wait only on the invite route's own bucket
+            await self.rate_limits.acquire(INVITE_ROUTE)
+
+            # Using the Public Invite API to check if a vanity exists
+            start_time = time.perf_counter()
+            async with self.session.get(
+                f"{self.api_base}/invites/{vanity_code}",
+                headers=self.headers
+            ) as response:
+                rtt = time.perf_counter() - start_time
+                self.metrics.check_rtt.observe(rtt)
+
+                # Update rate limit tracking
+                self.update_rate_limits(INVITE_ROUTE, response, rtt)
+
+                # 404 means the invite doesn't exist - which means the vanity is available
+                # Per-poll lines use lazy %-formatting so disabled or sampled-out
+                # records cost no string building on the event loop
+                if response.status == 404:
+                    logger.info("Vanity %s is available", vanity_code)
+                    self.availability.put(vanity_code, True)
+                    return True
+                # 200 means the invite exists - the vanity is taken
+                elif response.status == 200:
+                    logger.debug("Vanity %s is unavailable", vanity_code)
+                    self.availability.put(vanity_code, False)
+                    return False
+                # 429 means we're rate limited
+                elif response.status == 429:
+                    # The bucket now holds the reset deadline; the next acquire waits it out
+                    retry_after = float(response.headers.get('Retry-After', 1))
+                    logger.warning(f"Rate limited during availability check, retry after {retry_after}s")
+                    return None
+                else:
+                    # Other status code means we can't determine
+                    logger.error(f"Failed to check vanity availability: {response.status}")
+                    return None
+
+        except asyncio.TimeoutError as e:
+            logger.warning("Timeout while checking vanity availability")
+            if start_time is not None:
+                self.history.record(INVITE_ROUTE, NO_RESPONSE, time.perf_counter() - start_time)
+            self.breakers.record_exception(INVITE_ROUTE, e)
+            return None
+        except Exception as e:
+            logger.error(f"Error checking vanity availability: {e}")
+            self.breakers.record_exception(INVITE_ROUTE, e)
+            return None
+
+    def update_rate_limits(self, route, response, rtt=None):
+        """Update the rate limit tracking for a route from response headers"""
+        self.metrics.observe_response(route, response.status)
+        if rtt is not None:
+            self.history.record_response(route, response, rtt)
+            self.clock_sync.observe(response.headers, rtt)
+        if self.trace is not None:
+            self.trace.record(route, response)
+        self.rate_limits.update(route, response)
+        if self.breakers.record_status(route, response.status):
+            self.on_route_latched(route, response.status)
+
+    def on_route_latched(self, route, status):
+        """A 401/403 can't be retried away: stop using the route and alert"""
+        reason = fatal_reason(status)
+        if self.breakers.token_rejected is not None or route.key == INVITE_ROUTE.key:
+            # Nothing can be polled any more; stop instead of spending budget on refusals
+            logger.critical(f"Stopping the sniper: {reason} on {route.key}")
+            self.active = False
+            self.auto_restart = False
+            consequence = "The sniper has been stopped. Fix the token or permissions, then start it again."
+        else:
+            logger.critical(f"Skipping guild {route.major}: {reason}")
+            self.refresh_targets()
+            consequence = (f"Targets for server `{route.major}` are skipped until the sniper is restarted. "
+                           f"Grant the bot Manage Server there, then restart the sniper.")
+        self.background.spawn(self.notify_error(reason, route, consequence), name=f"alert-{route.key}")
+
+    async def attempt_set_vanity(self, guild_id, vanity_code):
+        """Try to set the vanity URL for the guild"""
+        start_time = None
+        try:
+            # URL, body and headers are built once per target, not per attempt
+            claim = self.claim_requests.get(self.api_base, guild_id, vanity_code, self.headers)
+
+            # The PATCH route's breaker: hold back while its circuit is open or backing off,
+            # and let exactly one half-open probe through when the cool-down ends
+            backoff = self.breakers.retry_after(claim.route)
+            if math.isinf(backoff):
+                return {"success": False, "reason": "latched"}
+            if backoff > 0:
+                logger.debug(f"Circuit for {claim.route.key} not ready, retrying in {backoff:.2f}s")
+                return {"success": False, "retry_after": backoff, "reason": "circuit"}
+
+            # Check the PATCH route's own bucket before attempting
+            wait_time = self.rate_limits.delay(claim.route)
+            if wait_time > 0:
+                logger.debug(f"Rate limit active, waiting {wait_time:.2f}s before setting vanity")
+                return {"success": False, "retry_after": wait_time}
+            self.rate_limits.consume(claim.route)
+
+            start_time = time.perf_counter()
+
+            # Make request to update vanity URL
+            async with self.session.patch(
+                claim.url,
+                data=claim.body,
+                headers=claim.headers,
+                timeout=5  # Add timeout to avoid hanging
+            ) as response:
+                elapsed = (time.perf_counter() - start_time) * 1000  # Convert to ms
+                self.metrics.claim_rtt.observe(elapsed / 1000)
+
+                # Update rate limit tracking
+                self.update_rate_limits(claim.route, response, elapsed / 1000)
+
+                # Check the status before touching the body
+                if response.status == 200:
+                    # Success! The PATCH response carries the code that is now set,
+                    # which makes a separate verification request unnecessary
+                    try:
+                        confirmed = claim.confirms(await response.json(content_type=None))
+                    except Exception:
+                        confirmed = False
+                    logger.info(f"Successfully set vanity URL to {vanity_code} in {elapsed:.2f}ms")
+                    return {"success": True, "elapsed": elapsed, "confirmed": confirmed}
+
+                # Handle rate limits
+                elif response.status == 429:
+                    retry_after = float(response.headers.get('Retry-After', 1))
+                    logger.warning(f"Rate limited, waiting {retry_after}s before retrying")
+                    return {"success": False, "retry_after": retry_after}
+
+                response_text = await response.text()
+                logger.debug(f"Set vanity response ({response.status}): {response_text}")
+
+                # URL is taken
+                if response.status == 400:
+                    try:
+                        error_json = json.loads(response_text)
+                        if "code" in error_json and error_json.get("code") == 50020:
+                            logger.debug(f"Vanity {vanity_code} is still taken")
+                            return {"success": False, "reason": "taken"}
+                        else:
+                            logger.warning(f"Unexpected error when setting vanity: {error_json}")
+                            return {"success": False, "reason": "error", "details": error_json}
+                    except:
+                        return {"success": False, "reason": "error", "details": response_text}
+
+                # Other errors
+                else:
+                    logger.error(f"Error when setting vanity (HTTP {response.status}): {response_text}")
+                    return {"success": False, "reason": "error", "status": response.status}
+
+        except asyncio.TimeoutError as e:
+            logger.warning("Timeout during vanity set attempt")
+            if start_time is not None:
+                self.history.record(vanity_patch_route(guild_id), NO_RESPONSE, time.perf_counter() - start_time)
+            self.breakers.record_exception(vanity_patch_route(guild_id), e)
+            return {"success": False, "reason": "timeout"}
+        except Exception as e:
+            logger.error(f"Exception during vanity set attempt: {e}")
+            self.breakers.record_exception(vanity_patch_route(guild_id), e)
+            return {"success": False, "reason": "exception", "details": str(e)}
+
+    async def verify_vanity_set(self, guild_id, vanity_code):
+        """Verify that the vanity URL has been successfully set"""
+        start_time = None
+        try:
+            route = vanity_get_route(guild_id)
+            # Wait for the verify route's breaker instead of sending into an outage
+            backoff = self.breakers.retry_after(route)
+            while backoff > 0:
+                if math.isinf(backoff):
+                    return False
+                await asyncio.sleep(backoff)
+                backoff = self.breakers.retry_after(route)
+            await self.rate_limits.acquire(route)
+
+            start_time = time.perf_counter()
+            async with self.session.get(
+                f"{self.api_base}/guilds/{guild_id}/vanity-url",
+                headers=self.headers,
+                timeout=5  # Add timeout to avoid hanging
+            ) as response:
+                rtt = time.perf_counter() - start_time
+                self.metrics.verify_rtt.observe(rtt)
+
+                # Update rate limit tracking
+                self.update_rate_limits(route, response, rtt)
+
+                if response.status == 200:
+                    data = await response.json()
+                    current_vanity = data.get("code")
+                    return current_vanity == vanity_code
+                return False
+        except asyncio.TimeoutError as e:
+            logger.warning("Timeout during vanity verification")
+            if start_time is not None:
+                self.history.record(vanity_get_route(guild_id), NO_RESPONSE, time.perf_counter() - start_time)
+            self.breakers.record_exception(vanity_get_route(guild_id), e)
+            return False
+        except Exception as e:
+            logger.error(f"Error verifying vanity: {e}")
+            self.breakers.record_exception(vanity_get_route(guild_id), e)
+            return False
+
+    async def snipe_vanity(self):
+        """Main sniping logic - runs in background to continuously try setting the vanity URL"""
+        if not self.watchlist.pending():
+            logger.error("No target vanity set for sniping!")
+            return
+        unroutable = [t.code for t in self.watchlist.pending() if not self.claim_guild(t)]
+        if unroutable:
+            logger.warning(f"No destination guild for {', '.join(unroutable)}, they won't be sniped")
+
+        # Wait until requests can actually be sent instead of sleeping a fixed time
+        if self.session is None or self.headers is None:
+            await self.session_ready.wait()
+
+        logger.info(f"Starting vanity sniper for codes: {', '.join(t.code for t in self.active_targets())}")
+        # Later changes to the interval or targets are pushed in by on_config_changed
+        self.scheduler.fallback_interval = self.config.get("check_interval", 0.5)
+        self.scheduler.reset()
+        self.refresh_targets()
+
+        # Open the poll and claim connections now so detection doesn't pay for a handshake
+        if self.http_pool:
+            await self.http_pool.warm()
+
+        try:
+            while self.active and not self.successful_snipe:
+                try:
+                    # Recomputed per pass so guild and target changes apply to the next claim
+                    pending = self.active_targets()
+                    if self.breakers.latched(INVITE_ROUTE):
+                        # on_route_latched already alerted
+                        self.active = False
+                        break
+                    if not pending:
+                        if self.claimed_guilds:
+                            logger.info("Every destination guild has its vanity, stopping sniper")
+                            self.successful_snipe = True
+                        elif self.watchlist.pending():
+                            logger.error("No destination guild left that the bot may claim for, stopping sniper")
+                        else:
+                            logger.info("Watchlist is empty, stopping sniper")
+                        self.active = False
+                        break
+
+                    released = self.detector.consume()
+                    target = self.watchlist.get(released) if released else None
+                    if target is not None and target in pending:
+                        # The gateway already told us the code was released
+                        is_available = True
+                    else:
+                        # Only poll targets whose owner we can't see; the rest are
+                        # covered by GUILD_UPDATE events without spending REST budget
+                        guilds = self.guilds()
+                        pollable = [t for t in pending if self.detector.find_owner(t.code, guilds) is None]
+                        if not pollable:
+                            await self.detector.wait(GATEWAY_RECHECK_INTERVAL)
+                            continue
+                        # Backing off after a transient error, or the circuit is open during an
+                        # outage; gateway releases still wake us
+                        backoff = self.breakers.retry_after(INVITE_ROUTE)
+                        if backoff > 0:
+                            await self.detector.wait(min(backoff, GATEWAY_RECHECK_INTERVAL))
+                            continue
+
+                        # One shared budget, split across targets by priority
+                        target = self.watchlist.next_target(pollable)
+                        is_available = await self.check_vanity_availability(target.code)
+                        target.record_check(is_available)
+                        if "first_poll" not in timeline.marks:
+                            timeline.mark("first_poll")
+                            logger.info(f"Startup timing since process start: {timeline.report()}")
+
+                    vanity_code = target.code
+                    # All guilds share this process, session and poll budget; only the
+                    # PATCH goes to the target's own guild (and its own bucket)
+                    guild_id = self.claim_guild(target)
+
+                    if is_available is True:
+                        logger.info(f"Vanity {vanity_code} is available! Attempting to claim...")
+
+                        # Try to set the vanity URL immediately
+                        self.stats["attempts"] += 1
+                        target.attempts += 1
+                        result = await self.attempt_set_vanity(guild_id, vanity_code)
+
+                        if result["success"]:
+                            if await self.complete_claim(target, guild_id, result):
+                                logger.info(f"Successfully sniped vanity URL: {vanity_code} for guild {guild_id}")
+                                # Other codes bound for this guild would overwrite the one just claimed
+                                self.claimed_guilds.add(guild_id)
+                                self.refresh_targets()
+                                await self.save_state()
+                                continue
+                            else:
+                                logger.warning("Vanity appears set but verification failed. Continuing attempts.")
+
+                        # The PATCH circuit is open; check again once it may be probed
+                        # (gateway releases still wake us)
+                        elif result.get("reason") == "circuit":
+                            await self.detector.wait(min(result["retry_after"], GATEWAY_RECHECK_INTERVAL))
+                            continue
+
+                        # Handle rate limits with exact timing
+                        elif "retry_after" in result:
+                            retry_after = result["retry_after"]
+                            logger.info(f"Rate limited, waiting exactly {retry_after:.2f}s")
+                            await asyncio.sleep(retry_after)
+                            self.metrics.observe_rate_limit_wait(vanity_patch_route(guild_id), retry_after)
+
+                        # If other error, log it and continue; the PATCH route's breaker has classified it
+                        else:
+                            self.stats["errors"] += 1
+
+                    elif is_available is False:
+                        # Vanity not available, keep checking
+                        logger.debug("Vanity %s is not available yet. Checking again soon.", vanity_code)
+
+                    elif is_available is None:
+                        # Error checking availability; the invite route's breaker sets the retry delay
+                        logger.warning("Error checking vanity availability. Will try again.")
+                        self.stats["errors"] += 1
+
+                    # Periodically update the state (every 50 attempts)
+                    if is_available is True and self.stats["attempts"] % 50 == 0:
+                        await self.save_state()
+
+                    # Pace the next check from the remaining rate-limit budget
+                    await self.scheduler.wait(wake=self.detector.event)
+
+                except asyncio.CancelledError:
+                    raise  # Re-raise to handle task cancellation
+                except Exception as e:
+                    logger.error(f"Unhandled exception in sniper loop: {e}")
+                    logger.error(traceback.format_exc())  # Log the full traceback
+                    self.stats["errors"] += 1
+                    await asyncio.sleep(1)  # Brief pause after errors
+
+        except asyncio.CancelledError:
+            logger.info("Sniper task was cancelled")
+            # Save state on cancellation
+            await self.save_state()
+            raise
+        except Exception as e:
+            logger.error(f"Unhandled exception in sniper task: {e}")
+            logger.error(traceback.format_exc())  # Log the full traceback
+            # Save state after crash; the supervisor decides whether to restart
+            await self.save_state()
+            raise
+
+    async def complete_claim(self, target, guild_id, result):
+        """Post-claim phase after a successful PATCH; returns whether the claim holds.
+
+        The claim is timestamped first, then verification, the state write and
+        the notification run concurrently. Only verification is awaited here:
+        persistence and notification are background tasks, so a slow disk or
+        channel send never delays the loop. The notification is held back
+        until the claim is confirmed and cancelled if verification fails.
+        """
+        target.claimed_at = time.time()
+        target.claimed_guild_id = guild_id
+        self.availability.put(target.code, False, source="claim")
+
+        loop = asyncio.get_running_loop()
+        verified = loop.create_future()
+        self.background.spawn(self.save_state(immediate=True), name=f"persist-claim-{target.code}")
+        notify = self.background.spawn(
+            self.notify_claim(target.code, result["elapsed"], verified=verified, guild_id=guild_id),
+            name=f"notify-claim-{target.code}",
+        )
+
+        if result.get("confirmed"):
+            confirmed = True
+        else:
+            try:
+                confirmed = await self.verify_vanity_set(guild_id, target.code)
+            except asyncio.CancelledError:
+                notify.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"Error verifying claim of {target.code}: {e}")
+                confirmed = False
+        verified.set_result(confirmed)
+
+        if not confirmed:
+            # Roll back; the earlier write is superseded by the next one
+            notify.cancel()
+            target.claimed_at = None
+            target.claimed_guild_id = None
+            self.availability.invalidate(target.code)
+            await self.save_state()
+        return confirmed
@@ -0,0 +1,76 @@
+"""Gateway-driven release detection.
+
+When the guild holding a watched code is one the bot is a member of,
+Discord pushes a ``GUILD_UPDATE`` with the new ``vanity_url_code`` as soon
+as the code is dropped. The detector turns that into an event the snipe
+loop can wait on, so such targets need no REST polling at all.
+"""
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("VanitySniper.Gateway")
+
+
+def _normalize(code):
+    return code.lower() if code else None
+
+
+class ReleaseDetector:
+    """Watches guild updates for watched codes being released"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.codes = set()
+        self.event = asyncio.Event()
+        # codes released over the gateway that the snipe loop has not claimed yet
+        self.pending = []
+        self.released_at = {}
+        self.detections = 0
+
+    def watch(self, codes):
+        """Replace the watched codes, discarding detections for codes no longer watched"""
+        self.codes = {_normalize(code) for code in codes if code}
+        self.pending = [code for code in self.pending if code in self.codes]
+        if not self.pending:
+            self.event.clear()
+
+    def find_owner(self, code, guilds):
+        """Return the visible guild currently holding ``code``, if any"""
+        code = _normalize(code)
+        if not code:
+            return None
+        for guild in guilds:
+            if _normalize(getattr(guild, "vanity_url_code", None)) == code:
+                return guild
+        return None
+
+    def guild_updated(self, before, after):
+        """Handle a guild update, returning the watched code it released (or None)"""
+        old_code = _normalize(getattr(before, "vanity_url_code", None))
+        new_code = _normalize(getattr(after, "vanity_url_code", None))
+        if old_code not in self.codes or new_code == old_code:
+            return None
+
+        self.released_at[old_code] = self.clock()
+        self.detections += 1
+        if old_code not in self.pending:
+            self.pending.append(old_code)
+        self.event.set()
+        logger.info(f"Gateway reported vanity {old_code} released by guild {after.id}")
+        return old_code
+
+    def consume(self):
+        """Pop the next pending released code, or return None"""
+        code = self.pending.pop(0) if self.pending else None
+        if not self.pending:
+            self.event.clear()
+        return code
+
+    async def wait(self, timeout):
+        """Wait up to ``timeout`` seconds for a release, returning True if one arrived"""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
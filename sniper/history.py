@@ -0,0 +1,195 @@
+"""Bounded in-memory history of REST poll results.
+
+Every response (and every timed-out request) is stored as one slot in a
+set of parallel ``array`` columns that are allocated once and then
+overwritten in a ring, so a multi-week run costs the same ~2 MB as the
+first hour and recording a poll allocates nothing. Routes are interned to
+small integers. Slots are written in time order, so a window's start is
+found by binary search rather than a scan. Exports and summaries copy the
+columns on the loop and do the work in the thread executor.
+"""
+import array
+import asyncio
+import csv
+import io
+import json
+import logging
+import time
+
+from sniper.trace import route_name
+
+logger = logging.getLogger("VanitySniper.History")
+
+# Records kept; at 10 polls/s this is close to three hours
+DEFAULT_CAPACITY = 100_000
+# Status recorded for requests that got no response (timeouts, connection errors)
+NO_RESPONSE = 0
+# Remaining budget recorded when the response carried no rate-limit headers
+UNKNOWN_REMAINING = -1
+EXPORT_FORMATS = ("csv", "jsonl")
+# Rows rendered per write during an export
+EXPORT_CHUNK = 5000
+
+CSV_FIELDS = ("wall_time", "monotonic", "route", "status", "rtt_ms", "remaining")
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class PollHistory:
+    """Fixed-size ring buffer of (monotonic ts, route, status, rtt, remaining) records"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, clock=time.monotonic):
+        self.capacity = capacity
+        self.clock = clock
+        self.ts = array.array('d', bytes(8 * capacity))
+        self.route_ids = array.array('H', bytes(2 * capacity))
+        self.statuses = array.array('H', bytes(2 * capacity))
+        self.rtts = array.array('f', bytes(4 * capacity))
+        self.remaining = array.array('i', bytes(4 * capacity))
+        self.routes = []
+        self._route_index = {}
+        self.total = 0
+        self._next = 0
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def nbytes(self):
+        return sum(column.itemsize * len(column)
+                   for column in (self.ts, self.route_ids, self.statuses, self.rtts, self.remaining))
+
+    def _route_id(self, route):
+        name = route_name(route)
+        route_id = self._route_index.get(name)
+        if route_id is None:
+            route_id = self._route_index[name] = len(self.routes)
+            self.routes.append(name)
+        return route_id
+
+    def record(self, route, status, rtt, remaining=UNKNOWN_REMAINING):
+        """Store one poll result; ``rtt`` in seconds"""
+        i = self._next
+        self.ts[i] = self.clock()
+        self.route_ids[i] = self._route_id(route)
+        self.statuses[i] = status
+        self.rtts[i] = rtt * 1000
+        self.remaining[i] = UNKNOWN_REMAINING if remaining is None else remaining
+        self._next = (i + 1) % self.capacity
+        self.total += 1
+
+    def record_response(self, route, response, rtt):
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        try:
+            remaining = int(remaining) if remaining is not None else UNKNOWN_REMAINING
+        except ValueError:
+            remaining = UNKNOWN_REMAINING
+        self.record(route, response.status, rtt, remaining)
+
+    def _first_since(self, since):
+        """Offset (from the oldest record) of the first record at or after ``since``"""
+        count = len(self)
+        start = (self._next - count) % self.capacity
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if self.ts[(start + middle) % self.capacity] < since:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def rows(self, since=None):
+        """Yield (monotonic, route, status, rtt_ms, remaining) from oldest to newest"""
+        count = len(self)
+        start = (self._next - count) % self.capacity
+        first = self._first_since(since) if since is not None else 0
+        for offset in range(first, count):
+            i = (start + offset) % self.capacity
+            yield self.ts[i], self.routes[self.route_ids[i]], self.statuses[i], self.rtts[i], self.remaining[i]
+
+    def summarize(self, window):
+        """Aggregate the records of the last ``window`` seconds"""
+        now = self.clock()
+        statuses = {}
+        rtts = []
+        min_remaining = None
+        for _, _, status, rtt, remaining in self.rows(since=now - window):
+            statuses[status] = statuses.get(status, 0) + 1
+            if status != NO_RESPONSE:
+                rtts.append(rtt)
+            if remaining != UNKNOWN_REMAINING:
+                min_remaining = remaining if min_remaining is None else min(min_remaining, remaining)
+        rtts.sort()
+        return {
+            "window": window,
+            "polls": sum(statuses.values()),
+            "statuses": dict(sorted(statuses.items())),
+            "rate_limited": statuses.get(429, 0),
+            "no_response": statuses.get(NO_RESPONSE, 0),
+            "rtt_p50_ms": _percentile(rtts, 0.5),
+            "rtt_p95_ms": _percentile(rtts, 0.95),
+            "rtt_max_ms": rtts[-1] if rtts else None,
+            "min_remaining": min_remaining,
+        }
+
+    async def summaries(self, windows):
+        """``summarize`` for each window, computed on a snapshot in the thread executor"""
+        snapshot = self.snapshot()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: [snapshot.summarize(window) for window in windows])
+
+    def snapshot(self):
+        """Copy of the buffer (cheap memcpy of the columns) that can be read off the loop"""
+        copy = PollHistory.__new__(PollHistory)
+        copy.capacity = self.capacity
+        copy.clock = self.clock
+        copy.ts = array.array('d', self.ts)
+        copy.route_ids = array.array('H', self.route_ids)
+        copy.statuses = array.array('H', self.statuses)
+        copy.rtts = array.array('f', self.rtts)
+        copy.remaining = array.array('i', self.remaining)
+        copy.routes = list(self.routes)
+        copy._route_index = dict(self._route_index)
+        copy.total = self.total
+        copy._next = self._next
+        return copy
+
+    def iter_export(self, fmt, wall_offset):
+        """Yield chunks of CSV or JSONL text; ``wall_offset`` maps monotonic to wall time"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}, expected one of {EXPORT_FORMATS}")
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == "csv" else None
+        if writer:
+            writer.writerow(CSV_FIELDS)
+        for n, (ts, route, status, rtt, remaining) in enumerate(self.rows(), 1):
+            row = (round(ts + wall_offset, 6), round(ts, 6), route, status, round(rtt, 3), remaining)
+            if writer:
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(dict(zip(CSV_FIELDS, row))) + "\n")
+            if n % EXPORT_CHUNK == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    async def export(self, path, fmt="csv"):
+        """Stream the current history to ``path`` without blocking the loop; returns the row count"""
+        snapshot = self.snapshot()
+        wall_offset = time.time() - self.clock()
+
+        def write():
+            with open(path, 'w', newline='') as f:
+                for chunk in snapshot.iter_export(fmt, wall_offset):
+                    f.write(chunk)
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, write)
+        logger.info(f"Exported {len(snapshot)} poll records to {path}")
+        return len(snapshot)
@@ -0,0 +1,145 @@
+"""Tuned, pre-warmed aiohttp connection pool for the sniper.
+
+The default ``aiohttp.ClientSession()`` opens connections lazily, has no
+request timeout and lets idle keep-alive connections be dropped by the
+server, so the first request after a quiet period pays for a fresh TCP+TLS
+handshake. The pool here sets explicit connector limits, keep-alive, DNS
+caching and timeouts, opens connections before sniping starts and keeps
+them warm in the background.
+"""
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+logger = logging.getLogger("VanitySniper.HTTP")
+
+# Connections kept open to the API host: one for polling, one for claiming
+WARM_CONNECTIONS = 2
+# How long an idle connection is kept around by the connector
+KEEPALIVE_TIMEOUT = 75.0
+# How often idle connections are exercised so the server doesn't close them
+KEEPALIVE_INTERVAL = 30.0
+DNS_CACHE_TTL = 300
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=5, connect=2, sock_connect=2, sock_read=4)
+
+
+class HttpPool:
+    """Owns the cog's ClientSession and keeps its connections warm"""
+
+    def __init__(self, api_base, connections=8, warm_connections=WARM_CONNECTIONS,
+                 keepalive_timeout=KEEPALIVE_TIMEOUT, keepalive_interval=KEEPALIVE_INTERVAL,
+                 dns_ttl=DNS_CACHE_TTL, timeout=REQUEST_TIMEOUT):
+        self.api_base = api_base
+        self.connections = connections
+        self.warm_connections = warm_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.keepalive_interval = keepalive_interval
+        self.dns_ttl = dns_ttl
+        self.timeout = timeout
+        self.session = None
+        self.connector = None
+        self.keepalive_task = None
+        self.created = 0
+        self.reused = 0
+        self.reconnects = 0
+        self.last_used = None
+
+    async def open(self):
+        """Create the session, returning it"""
+        if self.session is not None and not self.session.closed:
+            return self.session
+
+        self.connector = aiohttp.TCPConnector(
+            limit=self.connections,
+            limit_per_host=self.connections,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_ttl,
+            use_dns_cache=True,
+            enable_cleanup_closed=True,
+        )
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(self._on_create)
+        trace.on_connection_reuseconn.append(self._on_reuse)
+        trace.on_request_start.append(self._on_request)
+
+        self.session = aiohttp.ClientSession(
+            connector=self.connector,
+            timeout=self.timeout,
+            trace_configs=[trace],
+        )
+        return self.session
+
+    async def _on_create(self, session, context, params):
+        self.created += 1
+
+    async def _on_reuse(self, session, context, params):
+        self.reused += 1
+
+    async def _on_request(self, session, context, params):
+        self.last_used = time.monotonic()
+
+    def idle_connections(self):
+        conns = getattr(self.connector, "_conns", None) or {}
+        return sum(len(entries) for entries in conns.values())
+
+    def active_connections(self):
+        return len(getattr(self.connector, "_acquired", None) or ())
+
+    def stats(self):
+        idle = self.idle_connections()
+        active = self.active_connections()
+        return {
+            "open": idle + active,
+            "idle": idle,
+            "active": active,
+            "created": self.created,
+            "reused": self.reused,
+            "reconnects": self.reconnects,
+        }
+
+    async def _ping(self):
+        # The gateway URL route needs no auth and doesn't touch our rate-limit buckets
+        async with self.session.get(f"{self.api_base}/gateway") as response:
+            await response.read()
+
+    async def warm(self, count=None):
+        """Open (or refresh) ``count`` connections to the API host concurrently"""
+        if self.session is None or self.session.closed:
+            return
+        count = count or self.warm_connections
+        results = await asyncio.gather(*(self._ping() for _ in range(count)), return_exceptions=True)
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            # A stale keep-alive connection fails once; retrying opens a fresh one
+            self.reconnects += len(failures)
+            logger.debug(f"{len(failures)} warm-up request(s) failed ({failures[0]!r}), reconnecting")
+            await asyncio.gather(*(self._ping() for _ in failures), return_exceptions=True)
+        logger.debug(f"Connection pool warmed: {self.stats()}")
+
+    async def _keepalive_loop(self):
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            try:
+                idle_for = time.monotonic() - self.last_used if self.last_used else None
+                if idle_for is None or idle_for >= self.keepalive_interval \
+                        or self.idle_connections() < self.warm_connections:
+                    await self.warm()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Connection keep-alive failed: {e}")
+
+    def start_keepalive(self):
+        if self.keepalive_task is None or self.keepalive_task.done():
+            self.keepalive_task = asyncio.create_task(self._keepalive_loop())
+        return self.keepalive_task
+
+    async def close(self):
+        if self.keepalive_task:
+            self.keepalive_task.cancel()
+            self.keepalive_task = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
@@ -0,0 +1,95 @@
+"""Non-blocking, structured logging.
+
+Records are put on an in-process queue by a ``QueueHandler`` and formatted
+and written by a ``QueueListener`` thread, so neither message formatting
+nor stream I/O runs on the event loop. Per-poll debug lines are sampled
+per logger before they are even queued, which keeps debug tracing cheap
+enough to leave on in production.
+"""
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Keep 1 in N DEBUG records from these (per-poll) loggers
+DEFAULT_DEBUG_SAMPLING = {
+    "VanitySniper.Sniper": 100,
+    "VanitySniper.RateLimit": 100,
+    "VanitySniper.Scheduler": 100,
+}
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any ``extra`` fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """Lets through 1 in N DEBUG records per configured logger"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+        self._counters = {name: itertools.count() for name in self.rates}
+
+    def filter(self, record):
+        if record.levelno != logging.DEBUG:
+            return True
+        rate = self.rates.get(record.name)
+        if not rate or rate <= 1:
+            return True
+        return next(self._counters[record.name]) % rate == 0
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler formats the message in the calling thread; the queue
+    here never leaves the process, so the record can be passed through
+    untouched and ``%``-style arguments are only rendered by the listener.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(level=logging.INFO, fmt="json", sampling=None, stream=None):
+    """Route all logging through a queue listener thread, returning the listener"""
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSampler(DEFAULT_DEBUG_SAMPLING if sampling is None else sampling))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
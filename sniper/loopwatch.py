@@ -0,0 +1,114 @@
+"""Event loop lag watchdog.
+
+A heartbeat coroutine measures how late the loop runs a short sleep, which
+is exactly the delay any other coroutine (the snipe loop included) sees
+before it gets scheduled. A helper thread watches the heartbeat; when the
+loop stalls past the threshold it grabs the loop thread's current stack,
+so the warning names the callback that was hogging the loop.
+"""
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+logger = logging.getLogger("VanitySniper.LoopWatch")
+
+
+def loop_implementation(loop=None):
+    """Name of the running event loop implementation, e.g. 'asyncio' or 'uvloop'"""
+    loop = loop or asyncio.get_running_loop()
+    return type(loop).__module__.split(".")[0]
+
+
+def install_event_loop_policy():
+    """Use uvloop when it is installed; set VANITY_SNIPER_UVLOOP=0 to keep the default loop"""
+    if os.getenv("VANITY_SNIPER_UVLOOP", "1") == "0":
+        return "asyncio"
+    try:
+        import uvloop
+    except ImportError:
+        return "asyncio"
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return "uvloop"
+
+
+class LoopWatchdog:
+    """Measures event loop scheduling lag and reports stalls"""
+
+    def __init__(self, interval=0.1, threshold=0.1, metrics=None, window=600):
+        self.interval = interval
+        self.threshold = threshold
+        self.metrics = metrics
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        # Recent lag samples (``window`` * ``interval`` seconds worth)
+        self.recent = collections.deque(maxlen=window)
+        self._beat = None
+        self._loop_thread_id = None
+        self._stall_stack = None
+        self._task = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._beat = now
+            lag = max(0.0, now - start - self.interval)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.recent.append(lag)
+            if self.metrics is not None:
+                self.metrics.loop_lag.observe(lag)
+
+            # Always take the stack: one grabbed for a tick that stayed under the
+            # threshold must not be blamed for a later, unrelated stall
+            stack, self._stall_stack = self._stall_stack, None
+            if lag > self.threshold:
+                self.stalls += 1
+                if stack:
+                    logger.warning(f"Event loop lagged {lag * 1000:.1f}ms; loop was busy in:\n{stack}")
+                else:
+                    logger.warning(f"Event loop lagged {lag * 1000:.1f}ms")
+
+    def _watch(self):
+        # Runs in a helper thread: if the heartbeat is overdue, capture what the loop thread is running
+        while not self._stopped.wait(self.threshold / 2):
+            overdue = time.perf_counter() - self._beat - self.interval
+            if overdue > self.threshold and self._stall_stack is None:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self._stall_stack = "".join(traceback.format_stack(frame, limit=8))
+
+    def stats(self):
+        recent = list(self.recent)
+        return {
+            "last_ms": self.last_lag * 1000,
+            "recent_max_ms": max(recent) * 1000 if recent else 0.0,
+            "recent_avg_ms": sum(recent) / len(recent) * 1000 if recent else 0.0,
+            "max_ms": self.max_lag * 1000,
+            "stalls": self.stalls,
+        }
@@ -0,0 +1,158 @@
+"""Hot-path latency metrics in the Prometheus text format.
+
+Timings are taken with ``time.perf_counter`` and recorded into fixed-bucket
+histograms, so observing a value is a bisect and two integer increments.
+``MetricsServer`` serves everything on a local ``/metrics`` endpoint.
+"""
+import bisect
+import logging
+import time
+
+logger = logging.getLogger("VanitySniper.Metrics")
+
+# Seconds; covers sub-millisecond loop lag up to multi-second backoffs
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram"""
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {self.sum}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, amount=1, *label_values):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values):
+        return self.values.get(label_values, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+
+    def __init__(self, name, documentation, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.callback()
+        except Exception as e:
+            logger.debug(f"Gauge {self.name} failed: {e}")
+            return lines
+        if value is not None:
+            lines.append(f"{self.name} {value}")
+        return lines
+
+
+class Metrics:
+    """Registry of the sniper's metrics"""
+
+    def __init__(self):
+        self.check_rtt = Histogram("vanity_sniper_check_rtt_seconds", "Round trip of invite availability checks")
+        self.claim_rtt = Histogram("vanity_sniper_claim_rtt_seconds", "Round trip of vanity claim PATCH requests")
+        self.verify_rtt = Histogram("vanity_sniper_verify_rtt_seconds", "Round trip of vanity verification requests")
+        self.scheduler_drift = Histogram("vanity_sniper_scheduler_drift_seconds",
+                                         "How late the poll scheduler woke up compared to its target")
+        self.loop_lag = Histogram("vanity_sniper_event_loop_lag_seconds", "Event loop scheduling lag")
+        self.responses = Counter("vanity_sniper_responses_total", "REST responses by route and status",
+                                 ("route", "status"))
+        self.rate_limit_wait = Counter("vanity_sniper_rate_limit_wait_seconds_total",
+                                       "Time spent waiting on rate limits", ("route",))
+        self.gauges = []
+
+    @staticmethod
+    def now():
+        return time.perf_counter()
+
+    def observe_response(self, route, status):
+        self.responses.inc(1, f"{route.method} {route.path}", str(status))
+
+    def observe_rate_limit_wait(self, route, seconds):
+        self.rate_limit_wait.inc(seconds, f"{route.method} {route.path}")
+
+    def add_gauge(self, name, documentation, callback):
+        self.gauges.append(Gauge(name, documentation, callback))
+
+    def render(self):
+        lines = []
+        for metric in (self.check_rtt, self.claim_rtt, self.verify_rtt, self.scheduler_drift, self.loop_lag,
+                       self.responses, self.rate_limit_wait, *self.gauges):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves ``Metrics.render()`` on a local ``/metrics`` endpoint"""
+
+    def __init__(self, metrics, host="127.0.0.1", port=9109):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def _handle(self, request):
+        from aiohttp import web
+        return web.Response(text=self.metrics.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        # Imported here so processes without a metrics port don't load the server side of aiohttp
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
@@ -0,0 +1,252 @@
+"""Queued, rate-limit-aware delivery of notifications.
+
+Claim alerts used to be sent with ``channel.send`` as soon as the claim
+landed, sharing the bot's channel-message budget with command replies and
+status embeds. Now every notification is posted to a
+``NotificationDispatcher`` and delivered by its own worker task:
+
+* Messages go out by priority: ``CRITICAL`` (claims) before ``ALERT``
+  (errors that stop a target) before ``ROUTINE`` (status notices).
+* A non-critical message can carry a coalescing key. If another message
+  with the same key is posted while the first is still waiting, it replaces
+  the first, so a guild whose permissions flap produces one message instead
+  of a burst.
+* When ``notification_webhook_url`` is set, messages go through that
+  webhook with its own rate limiter, so they never compete with the bot's
+  channel sends. Otherwise they go to the channel sender the cog provides.
+* A failed delivery is put back on the queue after a jittered backoff, so
+  other messages keep flowing. It is dropped after ``MAX_ATTEMPTS``.
+"""
+import asyncio
+import itertools
+import logging
+import random
+import time
+
+from sniper.ratelimit import RateLimiter, Route
+
+logger = logging.getLogger("VanitySniper.Notify")
+
+CRITICAL = 0
+ALERT = 1
+ROUTINE = 2
+PRIORITY_NAMES = {CRITICAL: "critical", ALERT: "alert", ROUTINE: "routine"}
+
+# Deliveries per message before it is dropped
+MAX_ATTEMPTS = 5
+# Retry backoff: full jitter over base * 2^n
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+# Webhook answers that mean the URL itself is unusable (deleted webhook, bad token)
+WEBHOOK_UNUSABLE = (401, 403, 404)
+
+
+class DeliveryError(Exception):
+    """A delivery failed; ``retry_after`` (seconds) overrides the backoff if set"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class WebhookUnusable(DeliveryError):
+    """The webhook URL was refused; retrying it can't help"""
+
+
+class Notification:
+    """One queued message"""
+
+    def __init__(self, payload, priority=ROUTINE, key=None):
+        # Message body in webhook form: {"content": ..., "embeds": [embed dict, ...]}
+        self.payload = payload
+        self.priority = priority
+        # Coalescing key; claim alerts are never replaced
+        self.key = key if priority != CRITICAL else None
+        self.attempts = 0
+        # Set when a newer message with the same key took this one's place
+        self.superseded = False
+        # Delivered, dropped or superseded
+        self.settled = False
+
+
+def webhook_route(url):
+    """Rate-limit route of a webhook URL (.../webhooks/{id}/{token}), keyed by webhook ID"""
+    parts = url.rstrip("/").split("/")
+    try:
+        webhook_id = parts[parts.index("webhooks") + 1]
+    except (ValueError, IndexError):
+        webhook_id = url
+    return Route("POST", "/webhooks/{webhook_id}/{token}", webhook_id)
+
+
+class NotificationDispatcher:
+    """Priority queue of notifications plus the worker that delivers them"""
+
+    def __init__(self, session=None, send_channel=None, webhook_url=None, clock=time.monotonic, clock_sync=None):
+        # Returns the aiohttp session used for webhook posts, or None before it exists
+        self.session = session or (lambda: None)
+        # async send_channel(payload) delivers through the bot; raising makes the message retry
+        self.send_channel = send_channel
+        self.clock = clock
+        # Webhooks have their own buckets, separate from the bot's routes
+        self.rate_limits = RateLimiter(clock=clock, clock_sync=clock_sync)
+        self.webhook_url = None
+        self.webhook = None
+        # Why the webhook was given up on for this run, if it was
+        self.webhook_failed = None
+        self.set_webhook(webhook_url)
+        self._queue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        # Coalescing key -> the message currently waiting under it
+        self._keyed = {}
+        # Messages posted but not yet delivered or dropped, including those waiting to retry
+        self.pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        # Messages waiting out a retry backoff -> their timer
+        self._retries = {}
+        self._worker = None
+        self.stats = {"sent": 0, "webhook": 0, "channel": 0, "coalesced": 0, "retries": 0, "dropped": 0}
+
+    @property
+    def deliverable(self):
+        return bool(self.webhook_url or self.send_channel)
+
+    def set_webhook(self, url):
+        """Switch to a new webhook URL (or back to the channel sender with None)"""
+        self.webhook_url = url or None
+        self.webhook = webhook_route(url) if url else None
+        self.webhook_failed = None
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run(), name="notifications")
+
+    def post(self, payload, priority=ROUTINE, key=None):
+        """Queue a message without waiting for it to be delivered; returns the Notification or None"""
+        if not self.deliverable:
+            logger.debug(f"No webhook or channel sender, not queueing {PRIORITY_NAMES[priority]} notification")
+            return None
+        notification = Notification(payload, priority, key)
+        if notification.key is not None:
+            old = self._keyed.get(notification.key)
+            if old is not None:
+                old.superseded = True
+                self._settle(old)
+                self.stats["coalesced"] += 1
+            self._keyed[notification.key] = notification
+        self.pending += 1
+        self._idle.clear()
+        self._enqueue(notification)
+        return notification
+
+    def _enqueue(self, notification):
+        self._queue.put_nowait((notification.priority, next(self._seq), notification))
+
+    def _settle(self, notification):
+        """A message left the system: delivered, dropped or replaced"""
+        if notification.settled:
+            return
+        notification.settled = True
+        if notification.key is not None and self._keyed.get(notification.key) is notification:
+            del self._keyed[notification.key]
+        self.pending -= 1
+        if self.pending <= 0:
+            self.pending = 0
+            self._idle.set()
+
+    async def _run(self):
+        while True:
+            _, _, notification = await self._queue.get()
+            if notification.superseded:
+                continue
+            try:
+                await self._deliver(notification)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._retry(notification, e)
+            else:
+                self.stats["sent"] += 1
+                self._settle(notification)
+
+    async def _deliver(self, notification):
+        notification.attempts += 1
+        session = self.session()
+        if self.webhook_url and session is not None:
+            try:
+                await self._send_webhook(session, notification.payload)
+                self.stats["webhook"] += 1
+                return
+            except WebhookUnusable as e:
+                logger.error(f"Notification webhook refused ({e}), falling back to the notification channel")
+                self.webhook_failed = str(e)
+                self.webhook_url = None
+                if self.send_channel is None:
+                    raise
+        if self.send_channel is None:
+            raise DeliveryError("no notification webhook or channel available")
+        await self.send_channel(notification.payload)
+        self.stats["channel"] += 1
+
+    async def _send_webhook(self, session, payload):
+        route = self.webhook
+        # Waits only on this webhook's bucket, never on the bot's routes
+        await self.rate_limits.acquire(route)
+        async with session.post(self.webhook_url, params={"wait": "true"}, json=payload) as response:
+            self.rate_limits.update(route, response)
+            if response.status < 300:
+                return
+            if response.status == 429:
+                # The bucket now holds the reset; the next acquire waits it out
+                raise DeliveryError("webhook rate limited", retry_after=0.0)
+            if response.status in WEBHOOK_UNUSABLE:
+                raise WebhookUnusable(f"HTTP {response.status}")
+            raise DeliveryError(f"webhook answered HTTP {response.status}")
+
+    def _retry(self, notification, error):
+        if notification.attempts >= MAX_ATTEMPTS or isinstance(error, WebhookUnusable):
+            self.stats["dropped"] += 1
+            logger.error(f"Dropping {PRIORITY_NAMES[notification.priority]} notification after "
+                         f"{notification.attempts} attempts: {error!r}")
+            self._settle(notification)
+            return
+        delay = getattr(error, "retry_after", None)
+        if delay is None:
+            ceiling = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (notification.attempts - 1))
+            delay = random.uniform(RETRY_BASE_DELAY / 2, ceiling)
+        self.stats["retries"] += 1
+        logger.warning(f"Notification delivery failed ({error!r}), retrying in {delay:.1f}s")
+        if delay <= 0:
+            # Straight back into the queue, ahead of anything of lower priority
+            self._enqueue(notification)
+            return
+        self._retries[notification] = asyncio.get_running_loop().call_later(delay, self._requeue, notification)
+
+    def _requeue(self, notification):
+        del self._retries[notification]
+        if not notification.superseded:
+            self._enqueue(notification)
+
+    async def close(self, timeout=None):
+        """Wait up to ``timeout`` seconds for queued messages, then stop the worker"""
+        if self.pending and self._worker is not None:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Shutting down with {self.pending} notifications undelivered")
+        for handle in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    def snapshot(self):
+        return {
+            "pending": self.pending,
+            "transport": "webhook" if self.webhook_url else "channel" if self.send_channel else None,
+            "webhook_failed": self.webhook_failed,
+            **self.stats,
+        }
@@ -0,0 +1,138 @@
+"""Atomic, debounced JSON persistence that keeps disk I/O off the event loop.
+
+``JsonStore.schedule()`` only marks the store dirty; the snapshot is
+serialised on the loop (so it can't race with mutations) and written a
+moment later in the default thread executor, so a burst of changes becomes
+a single write. Files are written to a temporary file in the same
+directory, fsynced and renamed over the target, so a crash leaves either
+the old or the new file, never a truncated one.
+"""
+import asyncio
+import glob
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger("VanitySniper.Persistence")
+
+# Seconds to wait for more changes before writing
+DEFAULT_DELAY = 1.0
+
+
+def write_json_atomic(path, data, indent=None):
+    """Write ``data`` as JSON to ``path`` atomically (blocking)"""
+    write_bytes_atomic(path, json.dumps(data, indent=indent).encode())
+
+
+def write_bytes_atomic(path, payload):
+    """Write ``payload`` to ``path`` via temp file + fsync + rename (blocking)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_json_recovering(path):
+    """Read JSON from ``path`` after cleaning up any interrupted writes.
+
+    Returns None if the file doesn't exist. A file that can't be parsed is
+    moved aside to ``<path>.corrupt`` and None is returned, so startup
+    falls back to defaults instead of crashing.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    for leftover in glob.glob(os.path.join(directory, f".{os.path.basename(path)}.*.tmp")):
+        try:
+            os.unlink(leftover)
+            logger.info(f"Removed leftover temp file from an interrupted write: {leftover}")
+        except OSError:
+            pass
+
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (ValueError, UnicodeDecodeError) as e:
+        corrupt_path = path + ".corrupt"
+        logger.error(f"Could not parse {path} ({e}), moving it to {corrupt_path}")
+        try:
+            os.replace(path, corrupt_path)
+        except OSError:
+            pass
+        return None
+
+
+class JsonStore:
+    """Debounced, coalescing writer for one JSON file"""
+
+    def __init__(self, path, snapshot, delay=DEFAULT_DELAY, indent=None, on_written=None):
+        self.path = path
+        # Callable returning the data to persist at write time
+        self.snapshot = snapshot
+        # Called on the loop right after each successful write
+        self.on_written = on_written
+        self.delay = delay
+        self.indent = indent
+        self.writes = 0
+        self._dirty = False
+        self._timer = None
+        self._sleeping = False
+        self._lock = asyncio.Lock()
+
+    def schedule(self):
+        """Mark the store dirty; the latest snapshot is written after ``delay``"""
+        self._dirty = True
+        if self._timer is None or self._timer.done():
+            self._sleeping = True
+            self._timer = asyncio.create_task(self._write_later())
+
+    async def _write_later(self):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            return
+        finally:
+            self._sleeping = False
+        await self._write()
+
+    async def _write(self):
+        async with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            try:
+                # Serialise on the loop so the snapshot can't change underneath us
+                payload = json.dumps(self.snapshot(), indent=self.indent).encode()
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, write_bytes_atomic, self.path, payload)
+                self.writes += 1
+                logger.debug(f"Wrote {self.path}")
+                if self.on_written is not None:
+                    self.on_written()
+            except Exception as e:
+                self._dirty = True
+                logger.error(f"Failed to write {self.path}: {e}")
+
+    async def flush(self):
+        """Write any pending changes now"""
+        # Only cancel a timer that is still waiting; one that is mid-write holds the lock
+        if self._timer is not None and self._sleeping:
+            self._timer.cancel()
+        await self._write()
+
+    def load(self):
+        """Read the file with crash recovery (blocking, for startup)"""
+        return read_json_recovering(self.path)
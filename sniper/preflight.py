@@ -0,0 +1,114 @@
+"""Preflight checks of what the bot can do in each destination guild.
+
+A vanity PATCH only succeeds if the guild has the ``VANITY_URL`` feature
+(boost level 3, or partnered/verified) and the bot has Manage Server. All
+of this is in the gateway cache, so it is checked before sniping starts
+rather than discovered as an error at the moment a code is released. Results
+are cached per guild. The cog refreshes them on guild, role, member and
+membership events.
+"""
+import logging
+import time
+
+logger = logging.getLogger("VanitySniper.Preflight")
+
+VANITY_FEATURE = "VANITY_URL"
+# Boost level that grants the feature to guilds without a partner/verified badge
+VANITY_BOOST_TIER = 3
+
+
+class GuildCapabilities:
+    """Snapshot of one guild's vanity-related capabilities"""
+
+    def __init__(self, guild_id, name=None, cached=False, vanity_feature=False, manage_guild=False,
+                 premium_tier=None, problems=(), checked_at=None):
+        self.guild_id = guild_id
+        self.name = name
+        # False while the guild isn't in the gateway cache yet (before READY, or an outage)
+        self.cached = cached
+        self.vanity_feature = vanity_feature
+        self.manage_guild = manage_guild
+        self.premium_tier = premium_tier
+        self.problems = list(problems)
+        self.checked_at = checked_at
+
+    @property
+    def blocked(self):
+        """A claim for this guild is known to fail"""
+        return bool(self.problems)
+
+    def describe(self):
+        if self.problems:
+            return "; ".join(self.problems)
+        if not self.cached:
+            return "not checked yet (server not in the gateway cache)"
+        return f"ready (boost level {self.premium_tier}, Manage Server granted)"
+
+
+def inspect_guild(guild_id, guild, clock=time.time):
+    """Work out a guild's capabilities from the cached ``discord.Guild`` (or None)"""
+    now = clock()
+    if guild is None or getattr(guild, "unavailable", False):
+        return GuildCapabilities(guild_id, checked_at=now)
+
+    problems = []
+    vanity_feature = VANITY_FEATURE in guild.features
+    tier = guild.premium_tier
+    if not vanity_feature:
+        if tier < VANITY_BOOST_TIER:
+            problems.append(f"needs boost level {VANITY_BOOST_TIER} for a vanity URL (currently level {tier})")
+        else:
+            problems.append(f"doesn't have the {VANITY_FEATURE} feature")
+
+    me = guild.me
+    manage_guild = bool(me and me.guild_permissions.manage_guild)
+    if me is None:
+        problems.append("the bot's member isn't cached, so its permissions are unknown")
+    elif not manage_guild:
+        problems.append("the bot is missing the Manage Server permission")
+
+    return GuildCapabilities(guild_id, guild.name, True, vanity_feature, manage_guild, tier, problems, now)
+
+
+class CapabilityCache:
+    """Per-guild capability snapshots, recomputed only when an event says they may have changed"""
+
+    def __init__(self, get_guild, clock=time.time):
+        self.get_guild = get_guild
+        self.clock = clock
+        self._entries = {}
+
+    def get(self, guild_id):
+        entry = self._entries.get(guild_id)
+        if entry is None or not entry.cached:
+            # Guilds missing from the cache are retried on every lookup until they appear
+            entry = self._entries[guild_id] = inspect_guild(guild_id, self.get_guild(guild_id), self.clock)
+        return entry
+
+    def refresh(self, guild_id):
+        """Recompute one guild; returns (capabilities, whether its blocked state changed)"""
+        old = self._entries.get(guild_id)
+        new = self._entries[guild_id] = inspect_guild(guild_id, self.get_guild(guild_id), self.clock)
+        changed = old is not None and old.blocked != new.blocked
+        if changed:
+            logger.info(f"Guild {guild_id} capabilities changed: {new.describe()}")
+        return new, changed
+
+    def removed(self, guild_id):
+        """The bot left or was removed from the guild"""
+        self._entries[guild_id] = GuildCapabilities(
+            guild_id, cached=True, problems=["the bot is no longer in this server"], checked_at=self.clock()
+        )
+
+    def invalidate(self, guild_id):
+        self._entries.pop(guild_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def blocked(self, guild_id):
+        return self.get(guild_id).blocked
+
+    def check(self, guild_ids):
+        """Fresh preflight of ``guild_ids``: {guild_id: capabilities}"""
+        return {guild_id: self.refresh(guild_id)[0] for guild_id in guild_ids}
@@ -0,0 +1,207 @@
+"""Per-route Discord rate-limit buckets.
+
+Discord groups routes into buckets identified by ``X-RateLimit-Bucket`` and
+scopes them by major parameter (the guild ID for guild routes). Every route
+the sniper uses is tracked separately here so an exhausted invite lookup
+never blocks a vanity PATCH and vice versa. Deadlines are kept on the
+monotonic clock using ``X-RateLimit-Reset-After``; the global limit is
+tracked on its own. Only when a response carries just the epoch
+``X-RateLimit-Reset`` is a wall-clock time involved, and it is converted
+using the server clock offset estimated by ``sniper.timesync``.
+"""
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("VanitySniper.RateLimit")
+
+# Discord's published global limit for bot tokens
+GLOBAL_LIMIT = 50
+GLOBAL_PERIOD = 1.0
+
+
+class Route:
+    """A REST route plus its major parameter, used as the bucket lookup key"""
+
+    __slots__ = ("method", "path", "major", "key")
+
+    def __init__(self, method, path, major=None):
+        self.method = method
+        self.path = path
+        self.major = major
+        self.key = f"{method} {path}:{major}" if major is not None else f"{method} {path}"
+
+    def __repr__(self):
+        return f"<Route {self.key}>"
+
+
+INVITE_ROUTE = Route("GET", "/invites/{code}")
+
+
+def vanity_patch_route(guild_id):
+    return Route("PATCH", "/guilds/{guild_id}/vanity-url", guild_id)
+
+
+def vanity_get_route(guild_id):
+    return Route("GET", "/guilds/{guild_id}/vanity-url", guild_id)
+
+
+class RateLimitBucket:
+    """Budget state for one Discord bucket"""
+
+    def __init__(self, name):
+        self.name = name
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.reset_after = None
+        # Longest Reset-After seen, i.e. roughly the bucket's window length
+        self.period = 0.0
+        # Requests sent whose response hasn't updated the bucket yet
+        self.in_flight = 0
+
+    def delay(self, now):
+        """Seconds until a request may be sent on this bucket"""
+        if self.remaining is not None and self.remaining <= 0 and now < self.reset_at:
+            return self.reset_at - now
+        return 0.0
+
+    def consume(self, now):
+        """Account for a request that is about to be sent"""
+        if self.limit is not None and now >= self.reset_at:
+            # The window rolled over since our last response; requests lost
+            # to timeouts can't be counted against the new window either
+            self.remaining = self.limit
+            self.in_flight = 0
+            # Provisional deadline until a response reports the real one, so
+            # concurrent senders don't each start a fresh window
+            self.reset_at = now + self.period
+        self.in_flight += 1
+        if self.remaining is not None and self.remaining > 0:
+            self.remaining -= 1
+
+    def __repr__(self):
+        return f"<RateLimitBucket {self.name} {self.remaining}/{self.limit}>"
+
+
+class RateLimiter:
+    """Tracks every route's bucket plus the global limit"""
+
+    def __init__(self, clock=time.monotonic, global_limit=GLOBAL_LIMIT, global_period=GLOBAL_PERIOD, metrics=None,
+                 clock_sync=None):
+        self.clock = clock
+        self.metrics = metrics
+        # Converts epoch resets from the server's clock; local wall time if None
+        self.clock_sync = clock_sync
+        self.global_limit = global_limit
+        self.global_period = global_period
+        # route key -> bucket name reported by Discord
+        self._route_buckets = {}
+        # bucket name (or route key until known) + major -> bucket
+        self._buckets = {}
+        self._global_window_start = 0.0
+        self._global_count = 0
+        self._global_reset_at = 0.0
+
+    def _bucket_key(self, route):
+        name = self._route_buckets.get(route.key)
+        if name is None:
+            return route.key
+        return f"{name}:{route.major}" if route.major is not None else name
+
+    def get_bucket(self, route):
+        """Return the bucket the given route currently maps to"""
+        key = self._bucket_key(route)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = RateLimitBucket(key)
+        return bucket
+
+    def global_delay(self):
+        """Seconds until the global limit allows another request"""
+        now = self.clock()
+        if now < self._global_reset_at:
+            return self._global_reset_at - now
+        if now - self._global_window_start >= self.global_period:
+            return 0.0
+        if self._global_count >= self.global_limit:
+            return self._global_window_start + self.global_period - now
+        return 0.0
+
+    def delay(self, route):
+        """Seconds the given route has to wait, honouring both bucket and global limits"""
+        return max(self.global_delay(), self.get_bucket(route).delay(self.clock()))
+
+    def consume(self, route):
+        """Record a request on ``route`` without waiting"""
+        now = self.clock()
+        if now - self._global_window_start >= self.global_period:
+            self._global_window_start = now
+            self._global_count = 0
+        self._global_count += 1
+        self.get_bucket(route).consume(now)
+
+    async def acquire(self, route):
+        """Wait until ``route`` may send a request, then reserve it"""
+        while True:
+            wait_time = self.delay(route)
+            if wait_time <= 0:
+                break
+            logger.debug("Rate limit active on %s, waiting %.3fs", route.key, wait_time)
+            await asyncio.sleep(wait_time)
+            if self.metrics is not None:
+                self.metrics.observe_rate_limit_wait(route, wait_time)
+        self.consume(route)
+
+    def update(self, route, response):
+        """Update bucket state from a response's rate-limit headers"""
+        headers = response.headers
+        try:
+            now = self.clock()
+            bucket_name = headers.get('X-RateLimit-Bucket')
+            if bucket_name and self._route_buckets.get(route.key) != bucket_name:
+                old = self._buckets.pop(self._bucket_key(route), None)
+                self._route_buckets[route.key] = bucket_name
+                if old is not None:
+                    self._buckets.setdefault(self._bucket_key(route), old)
+            bucket = self.get_bucket(route)
+
+            if 'X-RateLimit-Limit' in headers:
+                bucket.limit = int(headers['X-RateLimit-Limit'])
+            bucket.in_flight = max(0, bucket.in_flight - 1)
+            if 'X-RateLimit-Remaining' in headers:
+                # The server hasn't seen our other in-flight requests yet
+                bucket.remaining = max(0, int(headers['X-RateLimit-Remaining']) - bucket.in_flight)
+            if 'X-RateLimit-Reset-After' in headers:
+                bucket.reset_after = float(headers['X-RateLimit-Reset-After'])
+                bucket.period = max(bucket.period, bucket.reset_after)
+                bucket.reset_at = now + bucket.reset_after
+            elif 'X-RateLimit-Reset' in headers:
+                reset = float(headers['X-RateLimit-Reset'])
+                until = self.clock_sync.until(reset) if self.clock_sync is not None else reset - time.time()
+                bucket.reset_at = now + max(0.0, until)
+
+            if response.status == 429:
+                retry_after = float(headers.get('Retry-After', 1))
+                is_global = headers.get('X-RateLimit-Global', '').lower() == 'true' \
+                    or headers.get('X-RateLimit-Scope') == 'global'
+                if is_global:
+                    self._global_reset_at = now + retry_after
+                    logger.warning(f"Global rate limit hit, pausing all routes for {retry_after:.2f}s")
+                else:
+                    bucket.remaining = 0
+                    bucket.reset_at = max(bucket.reset_at, now + retry_after)
+        except Exception as e:
+            logger.error(f"Error updating rate limits for {route.key}: {e}")
+
+    def snapshot(self):
+        """Remaining/limit/reset-after for every known bucket, for status output"""
+        now = self.clock()
+        return {
+            key: {
+                "remaining": bucket.remaining,
+                "limit": bucket.limit,
+                "reset_after": max(0.0, bucket.reset_at - now),
+            }
+            for key, bucket in self._buckets.items()
+        }
@@ -0,0 +1,131 @@
+"""Budget-aware pacing for the availability poll.
+
+Instead of stepping between a few fixed sleeps, the scheduler spreads the
+requests a bucket has left evenly over the time until it resets, so the
+poll runs at the highest rate the server allows without bursting into a
+stall. A ``reserve`` fraction of each window of the polled bucket (and of
+the global budget) is never spent on polling, so the claim PATCH always
+has headroom. Intervals are measured from the previous poll's send time
+rather than from when its response arrived. The configured interval
+(``check_interval``) is only a fallback: it paces polls until the route's
+rate-limit headers are known, after which the bucket decides.
+``reschedule()`` re-plans a wait in progress (e.g. after a config change)
+from that same send time, so the poll keeps its place in the rate-limit
+window.
+"""
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("VanitySniper.Scheduler")
+
+
+class PollScheduler:
+    """Paces polls on one route from that route's rate-limit bucket"""
+
+    def __init__(self, rate_limits, route, min_interval=0.1, reserve=0.1, fallback_interval=0.5,
+                 clock=time.monotonic, metrics=None):
+        self.rate_limits = rate_limits
+        self.route = route
+        self.min_interval = min_interval
+        # Fraction of the bucket's (and the global) budget never spent on polling
+        self.reserve = reserve
+        # Interval used until the route's rate-limit headers are known
+        self.fallback_interval = fallback_interval
+        self.clock = clock
+        self.metrics = metrics
+        self.last_interval = None
+        self._last_tick = None
+        self._rescheduled = asyncio.Event()
+
+    def reset(self):
+        """Forget the previous poll so the next one is not delayed"""
+        self._last_tick = None
+
+    def reschedule(self):
+        """Recompute a wait in progress, e.g. after the interval settings changed"""
+        self._rescheduled.set()
+
+    @property
+    def paced(self):
+        """True once the route's rate-limit headers are known and the fallback interval no longer applies"""
+        bucket = self.rate_limits.get_bucket(self.route)
+        return bucket.limit is not None and bucket.remaining is not None
+
+    def reserved(self, bucket):
+        """Requests per window of ``bucket`` held back from polling"""
+        return int(bucket.limit * self.reserve)
+
+    def global_interval(self):
+        """Smallest interval that keeps polling inside the unreserved global budget"""
+        usable = self.rate_limits.global_limit * (1.0 - self.reserve)
+        if usable <= 0:
+            return self.rate_limits.global_period
+        return self.rate_limits.global_period / usable
+
+    def next_interval(self, fallback_interval):
+        """Interval until the next poll, based on the bucket's remaining budget"""
+        bucket = self.rate_limits.get_bucket(self.route)
+        now = self.clock()
+
+        if bucket.limit is None or bucket.remaining is None:
+            # No headers seen yet, use the configured interval
+            interval = fallback_interval
+        elif now >= bucket.reset_at:
+            # The window has rolled over, spread the full limit over the next one. The last
+            # response's reset_after is ~0 by now, so use the tracked window length
+            window = bucket.period if bucket.period else fallback_interval * bucket.limit
+            interval = window / max(bucket.limit - self.reserved(bucket), 1)
+        elif bucket.remaining - self.reserved(bucket) <= 0:
+            # Only the reserved slice is left; leave it to the claim and wait for the reset
+            interval = bucket.reset_at - now
+        else:
+            # remaining + 1 gaps, so the last poll lands before the reset instead of on it
+            # (a poll at reset_at would be spent from the next window)
+            interval = (bucket.reset_at - now) / (bucket.remaining - self.reserved(bucket) + 1)
+
+        return max(interval, self.global_interval(), self.min_interval)
+
+    async def _sleep(self, delay, wake):
+        """Sleep ``delay`` seconds, returning True if ``wake`` or ``reschedule()`` cut it short"""
+        waiters = [asyncio.ensure_future(self._rescheduled.wait())]
+        if wake is not None:
+            waiters.append(asyncio.ensure_future(wake.wait()))
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        return bool(done)
+
+    async def wait(self, fallback_interval=None, wake=None):
+        """Sleep until the next poll is due, returning True if ``wake`` was set first"""
+        woken = False
+        started = self.clock()
+        due = None
+        while True:
+            interval = self.next_interval(fallback_interval or self.fallback_interval)
+            self.last_interval = interval
+            anchor = self._last_tick if self._last_tick is not None else started
+            delay = anchor + interval - self.clock()
+
+            self._rescheduled.clear()
+            if wake is not None and wake.is_set():
+                woken = True
+                break
+            if delay <= 0:
+                break
+            due = self.clock() + delay
+            if not await self._sleep(delay, wake):
+                break
+            due = None
+            if wake is not None and wake.is_set():
+                woken = True
+                break
+            # Rescheduled: recompute with the new settings from the same anchor
+
+        now = self.clock()
+        if self.metrics is not None and due is not None:
+            self.metrics.scheduler_drift.observe(max(0.0, now - due))
+        self._last_tick = now
+        return woken
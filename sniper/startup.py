@@ -0,0 +1,68 @@
+"""Startup timeline, measured from process start.
+
+Milestones (imports done, extensions loaded, HTTP session ready, first
+poll, ...) are recorded once each relative to when the process was
+created, not when this module was imported, so interpreter start-up and
+heavy imports are part of the report. The origin is taken from
+``/proc/self/stat`` where available. Reports end with the resident set
+size, so bot mode and headless mode can be compared from their logs.
+"""
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger("VanitySniper.Startup")
+
+
+def seconds_since_process_start():
+    """Seconds since this process was created (0.0 if the OS doesn't tell us)"""
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            # The command name may contain spaces; fields resume after its closing paren
+            fields = f.read().rsplit(b")", 1)[1].split()
+        started_ticks = int(fields[19])
+        return max(0.0, time.clock_gettime(time.CLOCK_BOOTTIME) - started_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, IndexError, ValueError, AttributeError):
+        return 0.0
+
+
+def rss_bytes():
+    """Current resident set size (peak RSS where /proc isn't available)"""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError, AttributeError):
+        try:
+            import resource
+        except ImportError:
+            return 0
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StartupTimeline:
+    """Named milestones in milliseconds since process start"""
+
+    def __init__(self):
+        self.origin = time.perf_counter() - seconds_since_process_start()
+        self.marks = {}
+
+    def mark(self, name):
+        """Record ``name`` the first time it is reached; later calls are ignored"""
+        if name in self.marks:
+            return
+        self.marks[name] = (time.perf_counter() - self.origin) * 1000
+        logger.debug(f"Startup milestone {name} at {self.marks[name]:.1f}ms")
+
+    def elapsed(self, name):
+        return self.marks.get(name)
+
+    def report(self):
+        marks = ", ".join(f"{name}={ms:.0f}ms" for name, ms in self.marks.items())
+        return f"{marks}, rss={rss_bytes() / 1024 / 1024:.1f}MB"
+
+
+# Shared by main.py and the cog
+timeline = StartupTimeline()
@@ -0,0 +1,107 @@
+"""Supervision of the long-running snipe task.
+
+The supervisor is the only thing that creates the snipe task. ``start()``
+is a no-op while a run is in flight, so a reconnect (``on_ready``) or a
+repeated command can never put a second poller on the shared rate-limit
+budget. When the task crashes it is restarted from the supervisor's own
+task after a jittered exponential backoff, rather than by the failing
+task scheduling its own replacement.
+"""
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger("VanitySniper.Supervisor")
+
+
+class Supervisor:
+    """Owns a single task built by ``factory`` and restarts it on crashes"""
+
+    def __init__(self, factory, name="snipe", should_restart=None, base_delay=0.1, max_delay=30.0,
+                 healthy_after=60.0, clock=time.monotonic, sleep=asyncio.sleep):
+        self.factory = factory
+        self.name = name
+        # Consulted after a crash; returning False lets the task stay down
+        self.should_restart = should_restart or (lambda: True)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # A run that lasted this long resets the backoff
+        self.healthy_after = healthy_after
+        self.clock = clock
+        self.sleep = sleep
+        self.starts = 0
+        self.crashes = 0
+        self.restarts = 0
+        self.last_error = None
+        self.last_delay = 0.0
+        self._failures = 0
+        self._task = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the task unless it is already running; returns whether it was started"""
+        if self.running:
+            logger.debug(f"{self.name} task already running, not starting another")
+            return False
+        self.starts += 1
+        self._failures = 0
+        self._task = asyncio.create_task(self._supervise(), name=f"{self.name}-supervisor")
+        return True
+
+    async def stop(self):
+        """Cancel the task (and any pending restart) and wait for it to finish"""
+        task, self._task = self._task, None
+        if task is None or task.done():
+            return
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def wait(self):
+        """Wait until the task is down for good: finished, stopped, or crashed with restarts disabled"""
+        task = self._task
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    def backoff(self):
+        """Delay before the next restart: full jitter over a capped exponential"""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (self._failures - 1))
+        return random.uniform(self.base_delay, max(self.base_delay, ceiling))
+
+    async def _supervise(self):
+        while True:
+            started = self.clock()
+            try:
+                await self.factory()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.crashes += 1
+                self.last_error = repr(e)
+                if self.clock() - started >= self.healthy_after:
+                    self._failures = 0
+                self._failures += 1
+
+            if not self.should_restart():
+                logger.info(f"{self.name} task crashed and restart is disabled")
+                return
+
+            self.last_delay = self.backoff()
+            logger.info(f"Restarting {self.name} task in {self.last_delay:.2f}s "
+                        f"(failure {self._failures}, {self.restarts} restarts so far)")
+            await self.sleep(self.last_delay)
+            self.restarts += 1
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "starts": self.starts,
+            "crashes": self.crashes,
+            "restarts": self.restarts,
+            "last_delay": self.last_delay,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,49 @@
+"""Ownership of background tasks spawned from the snipe loop.
+
+Work that must not hold up the loop (notifications, state writes after a
+claim) runs as separate tasks. ``TaskGroup`` keeps a reference to each of
+them so they aren't garbage collected mid-flight, logs their failures
+instead of letting them surface as "exception never retrieved", and lets
+the cog cancel or drain whatever is still running when it unloads.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger("VanitySniper.Tasks")
+
+
+class TaskGroup:
+    """Set of isolated background tasks"""
+
+    def __init__(self):
+        self.tasks = set()
+        self.failures = 0
+
+    def spawn(self, coro, name=None):
+        task = asyncio.create_task(coro, name=name)
+        self.tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task):
+        self.tasks.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            self.failures += 1
+            logger.error(f"Background task {task.get_name()} failed: {error!r}")
+
+    async def drain(self, timeout=None):
+        """Wait up to ``timeout`` seconds for running tasks, then cancel the rest"""
+        if not self.tasks:
+            return
+        done, pending = await asyncio.wait(set(self.tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def cancel(self):
+        for task in list(self.tasks):
+            task.cancel()
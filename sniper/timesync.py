@@ -0,0 +1,90 @@
+"""Estimate of the offset between Discord's clock and ours.
+
+Each response's ``Date`` header says the server's clock read ``D`` (whole
+seconds, truncated) somewhere between the moment we sent the request and
+the moment we got the answer. So the offset lies in ``[D - received,
+D + 1 - sent]``. Intersecting that interval over recent responses narrows
+it well below the header's one-second resolution. Whenever a response
+crosses a second boundary, the bound tightens to roughly the RTT.
+
+Rate-limit deadlines are kept on the monotonic clock; this estimate is
+only used where Discord hands us an absolute epoch (``X-RateLimit-Reset``)
+and to report how far the host clock has drifted.
+"""
+import collections
+import logging
+import time
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger("VanitySniper.TimeSync")
+
+# Responses kept for the estimate; older ones age out so drift is followed
+DEFAULT_WINDOW = 64
+# Log when the host clock is this far off
+SKEW_WARNING = 1.0
+
+
+class ClockSync:
+    """Server-minus-local clock offset, estimated from Date headers"""
+
+    def __init__(self, window=DEFAULT_WINDOW, wall=time.time):
+        self.wall = wall
+        # (lower, upper) offset bounds per response
+        self.samples = collections.deque(maxlen=window)
+        self.offset = 0.0
+        self.uncertainty = None
+        self._last_date = None
+        self._last_epoch = None
+        self._warned = False
+
+    def _parse(self, date):
+        # Many responses share the same second, so only parse when the header changes
+        if date != self._last_date:
+            self._last_epoch = parsedate_to_datetime(date).timestamp()
+            self._last_date = date
+        return self._last_epoch
+
+    def observe(self, headers, rtt):
+        """Fold in a response received just now, ``rtt`` seconds after its request was sent"""
+        date = headers.get('Date')
+        if not date:
+            return
+        try:
+            server = self._parse(date)
+        except (TypeError, ValueError):
+            return
+        received = self.wall()
+        sent = received - rtt
+        self.samples.append((server - received, server + 1.0 - sent))
+        self._estimate()
+
+    def _estimate(self):
+        lower = max(low for low, _ in self.samples)
+        upper = min(high for _, high in self.samples)
+        if lower > upper:
+            # Inconsistent with older samples: our clock was stepped. Start over from the newest
+            newest = self.samples[-1]
+            self.samples.clear()
+            self.samples.append(newest)
+            lower, upper = newest
+            logger.info("Clock offset samples disagreed (local clock adjusted?), restarting the estimate")
+        self.offset = (lower + upper) / 2
+        self.uncertainty = (upper - lower) / 2
+        if abs(self.offset) > SKEW_WARNING and self.uncertainty < SKEW_WARNING / 2 and not self._warned:
+            self._warned = True
+            logger.warning(f"Local clock is {self.offset:+.3f}s off Discord's; correcting epoch rate-limit resets")
+
+    def server_time(self):
+        """Current time on the server's clock (epoch seconds)"""
+        return self.wall() + self.offset
+
+    def until(self, epoch):
+        """Seconds from now until the server-clock ``epoch``"""
+        return epoch - self.server_time()
+
+    def snapshot(self):
+        return {
+            "offset": self.offset,
+            "uncertainty": self.uncertainty,
+            "samples": len(self.samples),
+        }
@@ -0,0 +1,83 @@
+"""Recording of REST response traces for offline replay.
+
+Each response the sniper sees is appended as one JSON line holding the
+time since recording started, the route, the status and the rate-limit
+headers. ``bench.simulation`` replays such files against the real snipe
+loop on a virtual clock. Lines are buffered in memory and written in the
+thread executor, so recording never blocks the event loop on disk.
+"""
+import asyncio
+import json
+import logging
+import time
+
+logger = logging.getLogger("VanitySniper.Trace")
+
+RECORDED_HEADERS = (
+    "X-RateLimit-Limit",
+    "X-RateLimit-Remaining",
+    "X-RateLimit-Reset-After",
+    "X-RateLimit-Bucket",
+    "X-RateLimit-Global",
+    "X-RateLimit-Scope",
+    "Retry-After",
+)
+
+# Lines buffered before a write is handed to the executor
+FLUSH_EVERY = 200
+
+
+def route_name(route):
+    """Trace key for a route, independent of its major parameter"""
+    return f"{route.method} {route.path}"
+
+
+def _append_lines(path, lines):
+    with open(path, 'a') as f:
+        f.write("".join(lines))
+
+
+class TraceRecorder:
+    """Appends response records to a JSONL trace file"""
+
+    def __init__(self, path, clock=time.monotonic):
+        self.path = path
+        self.clock = clock
+        self.started = clock()
+        self.recorded = 0
+        self._buffer = []
+        self._pending = None
+
+    def record(self, route, response):
+        headers = {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers}
+        entry = {
+            "t": round(self.clock() - self.started, 6),
+            "route": route_name(route),
+            "status": response.status,
+            "headers": headers,
+        }
+        self._buffer.append(json.dumps(entry) + "\n")
+        self.recorded += 1
+        if len(self._buffer) >= FLUSH_EVERY and (self._pending is None or self._pending.done()):
+            self._pending = asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, _append_lines, self.path, lines)
+        except Exception as e:
+            logger.error(f"Failed to write trace to {self.path}: {e}")
+
+
+def load_trace(path):
+    """Read a JSONL trace into a list of entries"""
+    entries = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    return entries
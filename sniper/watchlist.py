@@ -0,0 +1,156 @@
+"""Prioritised set of vanity codes watched by a single sniper.
+
+All targets share one poll scheduler, and therefore one REST budget. Each
+poll goes to the target picked by a smooth weighted round-robin over the
+targets' priorities, so a priority 3 code gets three times the checks of a
+priority 1 code without ever starving it. A target may name its own
+destination guild; targets without one are claimed for the configured
+default guild.
+"""
+import time
+
+MIN_PRIORITY = 1
+MAX_PRIORITY = 10
+
+
+def normalize_code(code):
+    return code.strip().lower()
+
+
+def is_valid_vanity_code(code):
+    """Vanity codes are 2-15 characters, alphanumeric with optional hyphens"""
+    return 2 <= len(code) <= 15 and all(c.isalnum() or c == '-' for c in code)
+
+
+class WatchTarget:
+    """One watched code plus its per-target statistics"""
+
+    def __init__(self, code, priority=MIN_PRIORITY, added_at=None, guild_id=None):
+        self.code = normalize_code(code)
+        self.priority = priority
+        # Guild the code is claimed for; None means the configured default guild
+        self.guild_id = guild_id
+        self.added_at = added_at or time.time()
+        self.checks = 0
+        self.errors = 0
+        self.attempts = 0
+        self.last_checked = None
+        self.last_result = None
+        self.claimed_at = None
+        # Guild the claim was made for, so it still counts if the default guild changes later
+        self.claimed_guild_id = None
+        self._current_weight = 0
+
+    @property
+    def claimed(self):
+        return self.claimed_at is not None
+
+    def record_check(self, result):
+        """Record the outcome of an availability check (True/False/None)"""
+        self.checks += 1
+        self.last_checked = time.time()
+        self.last_result = result
+        if result is None:
+            self.errors += 1
+
+    def to_dict(self):
+        return {
+            "code": self.code,
+            "priority": self.priority,
+            "guild_id": self.guild_id,
+            "added_at": self.added_at,
+            "checks": self.checks,
+            "errors": self.errors,
+            "attempts": self.attempts,
+            "claimed_at": self.claimed_at,
+            "claimed_guild_id": self.claimed_guild_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        target = cls(data["code"], data.get("priority", MIN_PRIORITY), data.get("added_at"), data.get("guild_id"))
+        target.checks = data.get("checks", 0)
+        target.errors = data.get("errors", 0)
+        target.attempts = data.get("attempts", 0)
+        target.claimed_at = data.get("claimed_at")
+        target.claimed_guild_id = data.get("claimed_guild_id")
+        return target
+
+    def __repr__(self):
+        return f"<WatchTarget {self.code} priority={self.priority}>"
+
+
+class Watchlist:
+    """Ordered collection of watch targets keyed by normalized code"""
+
+    def __init__(self):
+        self.targets = {}
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __bool__(self):
+        return bool(self.targets)
+
+    def __iter__(self):
+        return iter(sorted(self.targets.values(), key=lambda t: (-t.priority, t.added_at)))
+
+    def __contains__(self, code):
+        return normalize_code(code) in self.targets
+
+    def get(self, code):
+        return self.targets.get(normalize_code(code))
+
+    def add(self, code, priority=MIN_PRIORITY, guild_id=None):
+        """Add a code or update its priority (and destination guild, if given), returning the target"""
+        priority = max(MIN_PRIORITY, min(MAX_PRIORITY, int(priority)))
+        target = self.get(code)
+        if target is None:
+            target = WatchTarget(code, priority, guild_id=guild_id)
+            self.targets[target.code] = target
+        else:
+            target.priority = priority
+            if guild_id is not None:
+                target.guild_id = guild_id
+        return target
+
+    def remove(self, code):
+        """Remove a code, returning the removed target or None"""
+        return self.targets.pop(normalize_code(code), None)
+
+    def clear(self):
+        self.targets.clear()
+
+    def pending(self):
+        """Targets that have not been claimed yet"""
+        return [target for target in self if not target.claimed]
+
+    def primary(self):
+        """Highest priority unclaimed target, if any"""
+        pending = self.pending()
+        return pending[0] if pending else None
+
+    def next_target(self, candidates=None):
+        """Pick the next target to poll using smooth weighted round-robin"""
+        candidates = list(candidates) if candidates is not None else self.pending()
+        if not candidates:
+            return None
+
+        total = sum(target.priority for target in candidates)
+        best = None
+        for target in candidates:
+            target._current_weight += target.priority
+            if best is None or target._current_weight > best._current_weight:
+                best = target
+        best._current_weight -= total
+        return best
+
+    def to_list(self):
+        return [target.to_dict() for target in self]
+
+    def load(self, items):
+        """Replace the watchlist with targets from ``to_list`` output"""
+        self.targets = {}
+        for item in items:
+            target = WatchTarget.from_dict(item)
+            self.targets[target.code] = target
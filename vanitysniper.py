@@ -3,140 +3,173 @@ from discord.ext import commands, tasks
 import logging
 import asyncio
 import time
-import aiohttp
-import json
 import os
-import sys
-import traceback
+import tempfile
+
+from sniper.batch import parse_codes, check_batch, MAX_BATCH_CODES, MAX_ATTACHMENT_BYTES, DEFAULT_CONCURRENCY
+from sniper.breaker import CLOSED
+from sniper.config import ConfigError
+from sniper.engine import SniperEngine
+from sniper.history import EXPORT_FORMATS
+from sniper.loopwatch import loop_implementation
+from sniper.notify import CRITICAL, ALERT, ROUTINE
+from sniper.startup import timeline
+from sniper.watchlist import is_valid_vanity_code, MIN_PRIORITY, MAX_PRIORITY
 
 logger = logging.getLogger("VanitySniper.Sniper")
 
+# Minimum seconds between edits of a batch check's progress embed
+BATCH_EDIT_INTERVAL = 1.5
+# Largest attachment Discord accepts without boosts
+MAX_UPLOAD_BYTES = 8 * 1024 * 1024
+# Discord rejects embeds with more fields than this
+MAX_EMBED_FIELDS = 25
+# Most targets listed in v!status, even when there's room for more
+MAX_STATUS_TARGETS = 10
+
 class VanitySniper(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.active = False
-        self.target_vanity = None
-        self.start_time = None
-        self.session = None
-        self.headers = None
-        self.snipe_task = None
-        self.successful_snipe = False
-        self.stats = {
-            "attempts": 0,
-            "errors": 0,
-            "start_time": None
-        }
-        # Rate limit tracking
-        self.rate_limit_reset = 0
-        self.rate_limit_remaining = 0
-        self.auto_restart = True
-        self.min_check_interval = 0.1  # Minimum time between checks in seconds
+        # Polling, claiming, rate limits and state; this cog adds commands and gateway events
+        self.engine = SniperEngine(
+            bot.config,
+            guilds=lambda: self.bot.guilds,
+            get_guild=self.bot.get_guild,
+            notify_claim=self.send_success_notification,
+            notify_error=self.send_error_alert,
+            send_channel=self.send_to_channel,
+        )
         # Data backup task
         self.backup_task = None
     
     async def cog_load(self):
-        self.session = aiohttp.ClientSession()
-        # Initialize with settings from config
-        config = self.bot.config
-        if config["target_vanity"]:
-            self.target_vanity = config["target_vanity"]
+        await self.engine.open()
+        
+        # Extensions load from setup_hook, after login, so the token is already known
+        if self.bot.http.token:
+            self.engine.build_headers(self.bot.http.token)
         
         # Start config backup task
         self.backup_task = self.backup_config.start()
         
-        # Load state from backup if it exists
-        await self.load_state()
-        
         # Automatically start sniping if configured
-        if config.get("auto_start", False) and config.get("guild_id") and self.target_vanity:
+        if self.bot.config.get("auto_start", False) and self.engine.active_targets():
+            # No need to wait for READY: polling only needs the HTTP session,
+            # and snipe_vanity waits for that itself
             logger.info("Auto-starting vanity sniper due to config setting")
-            await asyncio.sleep(2)  # Brief delay to ensure bot is fully initialized
-            self.active = True
-            self.snipe_task = asyncio.create_task(self.snipe_vanity())
+            self.engine.start()
             
     async def cog_unload(self):
-        if self.snipe_task:
-            self.snipe_task.cancel()
-        
         if self.backup_task:
             self.backup_task.cancel()
-        
-        # Save state before unloading
-        await self.save_state()
-        
-        if self.session:
-            await self.session.close()
+        await self.engine.close()
     
-    async def save_state(self):
-        """Save the current state to a backup file"""
-        try:
-            state = {
-                "active": self.active,
-                "target_vanity": self.target_vanity,
-                "stats": self.stats,
-                "auto_restart": self.auto_restart
-            }
-            
-            # Save state to file
-            backup_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'vanity_state.json')
-            os.makedirs(os.path.dirname(backup_path), exist_ok=True)
-            
-            with open(backup_path, 'w') as f:
-                json.dump(state, f)
-                
-            logger.info("Successfully saved vanity sniper state")
-        except Exception as e:
-            logger.error(f"Failed to save state: {e}")
-    
-    async def load_state(self):
-        """Load state from backup file if it exists"""
-        try:
-            backup_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'vanity_state.json')
-            
-            if not os.path.exists(backup_path):
-                logger.info("No state backup found, using default settings")
-                return
-                
-            with open(backup_path, 'r') as f:
-                state = json.load(f)
-            
-            # Restore state
-            self.target_vanity = state.get("target_vanity", self.target_vanity)
-            self.auto_restart = state.get("auto_restart", True)
-            
-            # Only set active if auto_restart is enabled
-            if state.get("active", False) and self.auto_restart:
-                self.active = True
-            
-            logger.info(f"Successfully loaded vanity sniper state: target={self.target_vanity}, active={self.active}")
-        except Exception as e:
-            logger.error(f"Failed to load state: {e}")
+    def preflight_report(self, capabilities):
+        """One line per guild for command replies"""
+        return "\n".join(
+            f"{'⛔' if caps.blocked else '✅' if caps.cached else '❔'} {self.describe_guild(guild_id)}: {caps.describe()}"
+            for guild_id, caps in capabilities.items()
+        )
+    
+    def on_capabilities_changed(self, guild_id):
+        """Re-check a destination guild after an event that may have changed what the bot can do there"""
+        if guild_id not in self.engine.destination_guilds():
+            self.engine.capabilities.invalidate(guild_id)
+            return
+        caps, changed = self.engine.capabilities.refresh(guild_id)
+        if not changed:
+            return
+        self.engine.refresh_targets()
+        if caps.blocked:
+            logger.warning(f"Claims for guild {guild_id} would fail now: {caps.describe()}")
+            if self.engine.active:
+                # Same key as the all-clear below, so a flapping guild only sends its latest state
+                self.engine.background.spawn(
+                    self.send_error_alert(caps.describe(), None,
+                                          f"Targets for {self.describe_guild(guild_id)} are skipped until this is fixed.",
+                                          key=f"preflight-{guild_id}"),
+                    name=f"alert-preflight-{guild_id}",
+                )
+        else:
+            logger.info(f"Guild {guild_id} passes preflight again, resuming its targets")
+            if self.engine.active:
+                embed = discord.Embed(
+                    title="✅ Vanity Sniper Resumed",
+                    description=f"{self.describe_guild(guild_id)} passes preflight again, its targets are resumed.",
+                    color=discord.Color.green()
+                )
+                self.engine.notifier.post({"embeds": [embed.to_dict()]}, ROUTINE, key=f"preflight-{guild_id}")
     
     @tasks.loop(minutes=5)
     async def backup_config(self):
         """Periodically backup the sniper state"""
-        await self.save_state()
+        await self.engine.save_state()
     
     @commands.Cog.listener()
     async def on_ready(self):
-        # Set up the headers with the bot token for API requests
-        self.headers = {
-            "Authorization": f"Bot {self.bot.http.token}",
-            "Content-Type": "application/json",
-            "User-Agent": "DiscordBot (https://github.com/discord/discord-api-docs, v0.0.0)"
-        }
-        
-        # Auto-restart if configured and not already running
-        if self.auto_restart and not self.active and self.target_vanity and self.bot.config.get("guild_id"):
+        # Normally built in cog_load already; keep the same dict so prepared claims stay valid
+        if self.engine.headers is None:
+            self.engine.build_headers(self.bot.http.token)
+        # The guild cache is complete now; anything checked before READY is stale
+        self.engine.capabilities.clear()
+        for guild_id, caps in self.engine.capabilities.check(self.engine.destination_guilds()).items():
+            if caps.blocked:
+                logger.warning(f"Preflight failed for guild {guild_id}, its targets are skipped: {caps.describe()}")
+        self.engine.refresh_targets()
+        
+        # Auto-restart if configured and not already running; on_ready fires again
+        # on every reconnect, so only the supervisor decides whether a task exists
+        if self.engine.supervisor.running:
+            return
+        if self.engine.auto_restart and self.engine.active_targets():
             logger.info("Restarting vanity sniper after bot reconnect")
-            self.active = True
-            self.successful_snipe = False
-            self.stats = {
-                "attempts": 0,
-                "errors": 0,
-                "start_time": time.time()
-            }
-            self.snipe_task = asyncio.create_task(self.snipe_vanity())
+            self.engine.start(reset_stats=not self.engine.active)
+    
+    @commands.Cog.listener()
+    async def on_guild_update(self, before, after):
+        # Boosts and features (VANITY_URL) arrive here
+        if before.features != after.features or before.premium_tier != after.premium_tier:
+            self.on_capabilities_changed(after.id)
+        
+        # Any vanity change we can see is a free availability answer
+        if before.vanity_url_code != after.vanity_url_code:
+            self.engine.availability.put(before.vanity_url_code, True, source="gateway")
+            self.engine.availability.put(after.vanity_url_code, False, source="gateway")
+        
+        # Wake the snipe loop immediately if a watched code was just released
+        if self.engine.active:
+            released = self.engine.detector.guild_updated(before, after)
+            if released:
+                logger.info(f"Vanity {released} released (gateway), waking sniper")
+    
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        self.on_capabilities_changed(after.guild.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role):
+        self.on_capabilities_changed(role.guild.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.on_capabilities_changed(role.guild.id)
+    
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        # Only the bot's own roles decide its permissions
+        if self.bot.user is not None and after.id == self.bot.user.id and before.roles != after.roles:
+            self.on_capabilities_changed(after.guild.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self.on_capabilities_changed(guild.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.engine.capabilities.removed(guild.id)
+        if guild.id in self.engine.destination_guilds():
+            logger.warning(f"Removed from guild {guild.id}, its targets won't be claimed")
+            self.engine.refresh_targets()
     
     @commands.command(name="help")
     async def _help(self, ctx):
@@ -150,11 +183,34 @@ class VanitySniper(commands.Cog):
         # Add command descriptions
         embed.add_field(
             name="v!setvanity <code>",
-            value="Set the target vanity URL code to snipe.\n"
+            value="Set the target vanity URL code to snipe, replacing the watchlist.\n"
                   "Example: `v!setvanity mycoolserver`",
             inline=False
         )
         
+        embed.add_field(
+            name="v!addtarget <code> [priority] [server_id]",
+            value=f"Add a vanity code to the watchlist, or change its priority ({MIN_PRIORITY}-{MAX_PRIORITY}). "
+                  "Higher priority codes get a larger share of the check budget. Give a server ID to claim "
+                  "the code for that server instead of the default one (the bot needs Manage Server there).\n"
+                  "Example: `v!addtarget mycoolserver 3` or `v!addtarget shopname 5 123456789012345678`",
+            inline=False
+        )
+        
+        embed.add_field(
+            name="v!removetarget <code>",
+            value="Remove a vanity code from the watchlist.\n"
+                  "Example: `v!removetarget mycoolserver`",
+            inline=False
+        )
+        
+        embed.add_field(
+            name="v!targets",
+            value="List the watched vanity codes and their priorities.\n"
+                  "Example: `v!targets`",
+            inline=False
+        )
+        
         embed.add_field(
             name="v!setnotify",
             value="Set the current channel as the notification channel and register the server for vanity sniping.\n"
@@ -162,13 +218,29 @@ class VanitySniper(commands.Cog):
             inline=False
         )
         
+        embed.add_field(
+            name="v!setwebhook [url|off]",
+            value="Send notifications through a webhook instead of the bot, so they don't share its message limits. "
+                  "Without a URL, a webhook is created in the current channel.\n"
+                  "Example: `v!setwebhook` or `v!setwebhook off`",
+            inline=False
+        )
+        
         embed.add_field(
             name="v!startsniper",
-            value="Start the vanity sniper for the configured vanity code.\n"
+            value="Start the vanity sniper for the watched vanity codes.\n"
                   "Example: `v!startsniper`",
             inline=False
         )
         
+        embed.add_field(
+            name="v!preflight",
+            value="Check that every destination server has the vanity URL feature (boost level 3) "
+                  "and that the bot has Manage Server there.\n"
+                  "Example: `v!preflight`",
+            inline=False
+        )
+        
         embed.add_field(
             name="v!stopsniper",
             value="Stop the currently running vanity sniper.\n"
@@ -178,15 +250,25 @@ class VanitySniper(commands.Cog):
         
         embed.add_field(
             name="v!setinterval <seconds>",
-            value="Set how frequently the bot checks for vanity availability (in seconds).\n"
+            value="Set the check interval used until rate-limit headers are known (in seconds). "
+                  "After that, checks are paced from the remaining rate-limit budget.\n"
                   "Example: `v!setinterval 0.5`",
             inline=False
         )
         
         embed.add_field(
-            name="v!checkvanity [code]",
-            value="Check if a vanity URL is currently available. Uses the target vanity if no code is provided.\n"
-                  "Example: `v!checkvanity discord`",
+            name="v!checkvanity [codes...]",
+            value="Check if vanity URLs are currently available. Uses the target vanity if no code is provided. "
+                  f"Several codes (or an attached text file) are checked as a batch of up to {MAX_BATCH_CODES}.\n"
+                  "Example: `v!checkvanity discord` or `v!checkvanity alpha, beta, gamma`",
+            inline=False
+        )
+        
+        embed.add_field(
+            name="v!history [minutes | export csv|jsonl]",
+            value="Summarize recent poll results (status codes, latency, remaining budget), "
+                  "or export the full poll history as CSV or JSON lines.\n"
+                  "Example: `v!history 30` or `v!history export csv`",
             inline=False
         )
         
@@ -213,17 +295,86 @@ class VanitySniper(commands.Cog):
     async def setvanity(self, ctx, vanity_code: str):
         """Set the target vanity URL to snipe"""
         # Validate vanity code (2-15 characters, alphanumeric with optional hyphens)
-        if not (2 <= len(vanity_code) <= 15 and all(c.isalnum() or c == '-' for c in vanity_code)):
+        if not is_valid_vanity_code(vanity_code):
             return await ctx.send("❌ Invalid vanity code! It must be 2-15 characters, alphanumeric or hyphens.")
         
-        self.target_vanity = vanity_code.lower()
-        self.bot.config["target_vanity"] = self.target_vanity
+        self.engine.target_vanity = vanity_code.lower()
+        self.engine.refresh_targets()
+        self.bot.config["target_vanity"] = self.engine.target_vanity
         self.bot.save_config()
         
         # Save state after important change
-        await self.save_state()
+        await self.engine.save_state()
+        
+        await ctx.send(f"✅ Target vanity URL set to: `{self.engine.target_vanity}`")
+    
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def addtarget(self, ctx, vanity_code: str, priority: int = MIN_PRIORITY, guild_id: int = None):
+        """Add a vanity code to the watchlist, optionally for another server"""
+        if not is_valid_vanity_code(vanity_code):
+            return await ctx.send("❌ Invalid vanity code! It must be 2-15 characters, alphanumeric or hyphens.")
+        
+        if not MIN_PRIORITY <= priority <= MAX_PRIORITY:
+            return await ctx.send(f"❌ Priority must be between {MIN_PRIORITY} and {MAX_PRIORITY}.")
+        
+        if guild_id is not None:
+            # Claims use the bot's own permission in the destination server
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                return await ctx.send(f"❌ I'm not in a server with ID `{guild_id}`.")
+            caps, _ = self.engine.capabilities.refresh(guild_id)
+            if caps.blocked:
+                return await ctx.send(f"❌ Can't set the vanity URL of **{guild.name}**: {caps.describe()}.")
+        
+        existed = vanity_code in self.engine.watchlist
+        target = self.engine.watchlist.add(vanity_code, priority, guild_id)
+        self.engine.refresh_targets()
+        
+        # Save state after important change
+        await self.engine.save_state()
+        
+        destination = self.describe_guild(self.engine.claim_guild(target))
+        if existed:
+            await ctx.send(f"✅ Updated `{target.code}`: priority {target.priority}, claims for {destination}.")
+        else:
+            await ctx.send(f"✅ Added `{target.code}` to the watchlist with priority {target.priority}, claims for {destination}.")
+    
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def removetarget(self, ctx, vanity_code: str):
+        """Remove a vanity code from the watchlist"""
+        target = self.engine.watchlist.remove(vanity_code)
+        if target is None:
+            return await ctx.send(f"❌ `{vanity_code.lower()}` is not on the watchlist.")
+        
+        self.engine.refresh_targets()
+        
+        # Save state after important change
+        await self.engine.save_state()
+        
+        await ctx.send(f"✅ Removed `{target.code}` from the watchlist.")
+    
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def targets(self, ctx):
+        """List the watched vanity codes"""
+        if not self.engine.watchlist:
+            return await ctx.send("❌ The watchlist is empty. Use `v!addtarget` to add a code.")
+        
+        lines = []
+        for target in self.engine.watchlist:
+            state = "claimed" if target.claimed else f"priority {target.priority}"
+            lines.append(f"`{target.code}` - {state} → {self.describe_guild(self.engine.claim_guild(target))}")
         
-        await ctx.send(f"✅ Target vanity URL set to: `{self.target_vanity}`")
+        embed = discord.Embed(title="Vanity Watchlist", description="\n".join(lines), color=discord.Color.blue())
+        await ctx.send(embed=embed)
+    
+    def describe_guild(self, guild_id):
+        if not guild_id:
+            return "no server (run `v!setnotify` or pass a server ID)"
+        guild = self.bot.get_guild(guild_id)
+        return f"**{guild.name}**" if guild else f"server `{guild_id}`"
     
     @commands.command()
     @commands.has_permissions(administrator=True)
@@ -234,69 +385,118 @@ class VanitySniper(commands.Cog):
         self.bot.save_config()
         
         # Save state after important change
-        await self.save_state()
+        await self.engine.save_state()
         
         await ctx.send(f"✅ This channel has been set as the notification channel.")
+        caps, _ = self.engine.capabilities.refresh(ctx.guild.id)
+        if caps.blocked:
+            await ctx.send(f"⚠️ Vanity claims for this server would fail: {caps.describe()}.")
+    
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def setwebhook(self, ctx, url: str = None):
+        """Send notifications through a webhook (created in this channel if no URL is given), or `off`"""
+        if url and url.lower() == "off":
+            url = None
+        elif url:
+            # The URL carries the webhook's token; don't leave it in the channel
+            try:
+                await ctx.message.delete()
+            except discord.HTTPException:
+                pass
+        else:
+            try:
+                webhook = await ctx.channel.create_webhook(name="Vanity Sniper", reason="Vanity sniper notifications")
+            except discord.Forbidden:
+                return await ctx.send("❌ I need the Manage Webhooks permission in this channel to create a webhook.")
+            url = webhook.url
+        
+        # Takes effect in the running sniper right away (see on_config_changed)
+        try:
+            self.bot.config["notification_webhook_url"] = url
+        except ConfigError:
+            return await ctx.send("❌ That doesn't look like a Discord webhook URL.")
+        self.bot.save_config()
+        
+        if url:
+            await ctx.send("✅ Notifications will be sent through the webhook.")
+        else:
+            await ctx.send("✅ Notifications will be sent to the notification channel by the bot.")
     
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def startsniper(self, ctx):
         """Start sniping the target vanity URL"""
-        if not self.target_vanity:
-            return await ctx.send("❌ No target vanity URL set! Use `v!setvanity` first.")
+        if not self.engine.target_vanity:
+            return await ctx.send("❌ No target vanity URL set! Use `v!setvanity` or `v!addtarget` first.")
         
-        if not self.bot.config["guild_id"]:
-            return await ctx.send("❌ Guild ID not set! Run `v!setnotify` in the server you want to set the vanity for.")
-        
-        if self.active:
+        if self.engine.active or self.engine.supervisor.running:
             return await ctx.send("❌ Sniper is already running!")
         
-        self.active = True
-        self.successful_snipe = False
-        self.stats = {
-            "attempts": 0,
-            "errors": 0,
-            "start_time": time.time()
-        }
+        # A restart is how the operator says the token or permissions were fixed
+        self.engine.breakers.reset()
+        if not self.engine.destination_guilds():
+            return await ctx.send("❌ Guild ID not set! Run `v!setnotify` in the server you want to set the vanity for, "
+                                  "or give each target a server with `v!addtarget <code> <priority> <server_id>`.")
+        
+        # Find out now, not at release time, whether the claims can succeed
+        preflight = self.engine.capabilities.check(self.engine.destination_guilds())
+        if not self.engine.active_targets():
+            if self.engine.destination_guilds() <= self.engine.claimed_guilds:
+                return await ctx.send("❌ Every destination server already got its vanity from a claimed target. "
+                                      "Remove that target with `v!removetarget` to snipe another code for the server.")
+            return await ctx.send(f"❌ Preflight failed, no server can take a vanity URL:\n{self.preflight_report(preflight)}")
+        blocked = {guild_id: caps for guild_id, caps in preflight.items() if caps.blocked}
         
         # Enable auto-restart
-        self.auto_restart = True
+        self.engine.auto_restart = True
         self.bot.config["auto_start"] = True
         self.bot.save_config()
         
-        # Save state after important change
-        await self.save_state()
+        # Start sniping in a supervised, non-blocking task
+        self.engine.start()
         
-        # Start sniping in a non-blocking task
-        self.snipe_task = asyncio.create_task(self.snipe_vanity())
+        # Save state after important change
+        await self.engine.save_state()
         
-        await ctx.send(f"✅ Vanity sniper started for code: `{self.target_vanity}`")
+        codes = ", ".join(f"`{target.code}`" for target in self.engine.active_targets())
+        await ctx.send(f"✅ Vanity sniper started for: {codes}")
+        if blocked:
+            await ctx.send(f"⚠️ Skipping targets for servers that failed preflight:\n{self.preflight_report(blocked)}")
+    
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def preflight(self, ctx):
+        """Check the destination servers' vanity feature, boost level and the bot's permissions"""
+        guilds = self.engine.destination_guilds()
+        if not guilds:
+            return await ctx.send("❌ No destination server set. Use `v!setnotify` or `v!addtarget <code> <priority> <server_id>`.")
+        
+        report = self.preflight_report(self.engine.capabilities.check(guilds))
+        embed = discord.Embed(title="Vanity Sniper Preflight", description=report[:4096], color=discord.Color.blue())
+        await ctx.send(embed=embed)
     
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def stopsniper(self, ctx):
         """Stop the vanity sniper"""
-        if not self.active:
+        if not self.engine.active and not self.engine.supervisor.running:
             return await ctx.send("❌ Sniper is not currently running!")
         
-        if self.snipe_task:
-            self.snipe_task.cancel()
-            self.snipe_task = None
-        
-        self.active = False
-        self.auto_restart = False
+        await self.engine.stop()
+        self.engine.auto_restart = False
         self.bot.config["auto_start"] = False
         self.bot.save_config()
         
         # Save state after important change
-        await self.save_state()
+        await self.engine.save_state()
         
         # Calculate stats
-        duration = time.time() - self.stats["start_time"] if self.stats["start_time"] else 0
+        duration = time.time() - self.engine.stats["start_time"] if self.engine.stats["start_time"] else 0
         
         await ctx.send(f"✅ Vanity sniper stopped.\n"
-                     f"Attempts: {self.stats['attempts']}\n"
-                     f"Errors: {self.stats['errors']}\n"
+                     f"Attempts: {self.engine.stats['attempts']}\n"
+                     f"Errors: {self.engine.stats['errors']}\n"
                      f"Duration: {duration:.2f} seconds")
     
     @commands.command()
@@ -306,349 +506,369 @@ class VanitySniper(commands.Cog):
         if interval < 0.1:
             return await ctx.send("❌ Interval must be at least 0.1 seconds to avoid rate limits.")
         
-        self.bot.config["check_interval"] = max(interval, self.min_check_interval)
+        # Takes effect in the running sniper right away (see on_config_changed)
+        try:
+            self.bot.config["check_interval"] = max(interval, self.engine.min_check_interval)
+        except ConfigError as e:
+            return await ctx.send(f"❌ {e}")
         self.bot.save_config()
         
         # Save state after important change
-        await self.save_state()
+        await self.engine.save_state()
         
-        await ctx.send(f"✅ Check interval set to: `{self.bot.config['check_interval']}` seconds")
+        reply = f"✅ Check interval set to: `{self.bot.config['check_interval']}` seconds"
+        if self.engine.scheduler.paced:
+            reply += ("\nRate-limit headers are already known, so polls are paced from the remaining budget; "
+                      "this interval only applies until headers are seen again (e.g. after a restart).")
+        await ctx.send(reply)
     
     @commands.command()
     @commands.has_permissions(administrator=True)
-    async def checkvanity(self, ctx, vanity_code: str = None):
-        """Check if a vanity URL is available"""
-        code_to_check = vanity_code or self.target_vanity
+    async def checkvanity(self, ctx, *, codes: str = None):
+        """Check if a vanity URL (or a batch of them) is available"""
+        parsed = parse_codes(codes) if codes else ([], [])
+        if ctx.message.attachments or sum(map(len, parsed)) > 1:
+            return await self.check_vanity_batch(ctx, codes or "")
+        
+        # Normalized like batch mode, so pasted invite links work and bad input never reaches the API
+        valid, invalid = parsed
+        if invalid:
+            return await ctx.send("❌ Invalid vanity code! It must be 2-15 characters, alphanumeric or hyphens.")
+        code_to_check = valid[0] if valid else self.engine.target_vanity
         
         if not code_to_check:
             return await ctx.send("❌ No vanity code provided or set!")
         
-        # Show typing indicator while checking
-        async with ctx.typing():
-            is_available = await self.check_vanity_availability(code_to_check)
+        # Serve recent answers (the sniper's own polls, gateway events) from the cache
+        cached = self.engine.availability.get(code_to_check)
+        if cached is not None:
+            is_available = cached.available
+            note = f" _(cached {self.engine.availability.age(cached):.1f}s ago via {cached.source})_"
+        else:
+            # Show typing indicator while checking
+            async with ctx.typing():
+                is_available = await self.engine.check_vanity_availability(code_to_check)
+            note = ""
         
         if is_available is None:
             await ctx.send("❌ Failed to check vanity availability due to API error.")
         elif is_available:
-            await ctx.send(f"✅ The vanity URL `{code_to_check}` is **available**!")
+            await ctx.send(f"✅ The vanity URL `{code_to_check}` is **available**!{note}")
+        else:
+            await ctx.send(f"❌ The vanity URL `{code_to_check}` is **not available**.{note}")
+    
+    async def check_vanity_batch(self, ctx, text):
+        """Check a list of codes (inline and/or an attached file), streaming results into one embed"""
+        for attachment in ctx.message.attachments[:1]:
+            if attachment.size > MAX_ATTACHMENT_BYTES:
+                return await ctx.send(f"❌ Attachment is too large (max {MAX_ATTACHMENT_BYTES // 1024} KB).")
+            data = await attachment.read()
+            text += "\n" + data.decode("utf-8", errors="replace")
+        
+        codes, invalid = parse_codes(text)
+        if not codes:
+            return await ctx.send("❌ No valid vanity codes found. Codes must be 2-15 characters, alphanumeric or hyphens.")
+        skipped = codes[MAX_BATCH_CODES:]
+        codes = codes[:MAX_BATCH_CODES]
+        
+        results = {}
+        message = await ctx.send(embed=self.batch_embed(codes, results, invalid, skipped))
+        
+        async def cached_check(code):
+            cached = self.engine.availability.get(code)
+            if cached is not None:
+                return cached.available
+            return await self.engine.check_vanity_availability(code)
+        
+        # Leave most of the invite budget to the snipe loop while it is running
+        concurrency = 1 if self.engine.active else DEFAULT_CONCURRENCY
+        checks = asyncio.create_task(
+            check_batch(codes, cached_check, lambda code, result: results.__setitem__(code, result), concurrency)
+        )
+        rendered = 0
+        try:
+            while not checks.done():
+                await asyncio.wait({checks}, timeout=BATCH_EDIT_INTERVAL)
+                if len(results) != rendered and not checks.done():
+                    rendered = len(results)
+                    try:
+                        await message.edit(embed=self.batch_embed(codes, results, invalid, skipped))
+                    except discord.HTTPException as e:
+                        logger.warning(f"Failed to update batch check message: {e}")
+        finally:
+            checks.cancel()
+        await checks
+        await message.edit(embed=self.batch_embed(codes, results, invalid, skipped, done=True))
+    
+    def batch_embed(self, codes, results, invalid, skipped, done=False):
+        """Progress/result embed for a batch availability check"""
+        icons = {True: "✅", False: "❌", None: "⚠️"}
+        lines = [f"{icons[results[code]] if code in results else '⏳'} `{code}`" for code in codes]
+        available = sum(1 for result in results.values() if result is True)
+        taken = sum(1 for result in results.values() if result is False)
+        unknown = sum(1 for result in results.values() if result is None)
+        
+        embed = discord.Embed(
+            title=f"Vanity Check: {len(results)}/{len(codes)} checked",
+            description="\n".join(lines)[:4096],
+            color=discord.Color.green() if done else discord.Color.blue()
+        )
+        if invalid:
+            embed.add_field(name=f"Invalid ({len(invalid)})", value=", ".join(f"`{code}`" for code in invalid)[:1024], inline=False)
+        if skipped:
+            embed.add_field(name="Skipped", value=f"{len(skipped)} codes over the limit of {MAX_BATCH_CODES}", inline=False)
+        embed.set_footer(text=f"{available} available • {taken} taken • {unknown} unknown")
+        return embed
+    
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def history(self, ctx, window: str = None, fmt: str = "csv"):
+        """Summarize recent poll results or export the poll history"""
+        if window == "export":
+            return await self.export_history(ctx, fmt.lower())
+        
+        if window is None:
+            windows = [60, 600, 3600]
         else:
-            await ctx.send(f"❌ The vanity URL `{code_to_check}` is **not available**.")
+            try:
+                minutes = float(window)
+            except ValueError:
+                return await ctx.send("❌ Usage: `v!history [minutes]` or `v!history export [csv|jsonl]`")
+            if minutes <= 0:
+                return await ctx.send("❌ The window must be a positive number of minutes.")
+            windows = [minutes * 60]
+        
+        embed = discord.Embed(
+            title="Poll History",
+            description=f"{len(self.engine.history)} of {self.engine.history.total} records kept "
+                        f"({self.engine.history.nbytes() / 1024 / 1024:.1f} MB, capacity {self.engine.history.capacity})",
+            color=discord.Color.blue()
+        )
+        # Summaries run off the loop so a full buffer can't stall polling
+        summaries = await self.engine.history.summaries(windows)
+        for seconds, summary in zip(windows, summaries):
+            if not summary["polls"]:
+                value = "No polls"
+            else:
+                statuses = ", ".join(f"{status or 'timeout'}×{count}" for status, count in summary["statuses"].items())
+                value = f"Polls: {summary['polls']} ({statuses})"
+                if summary["rtt_p50_ms"] is not None:
+                    value += (f"\nRTT p50 {summary['rtt_p50_ms']:.1f}ms • p95 {summary['rtt_p95_ms']:.1f}ms "
+                              f"• max {summary['rtt_max_ms']:.1f}ms")
+                if summary["min_remaining"] is not None:
+                    value += f"\nLowest remaining budget: {summary['min_remaining']}"
+            label = f"Last {seconds / 60:g} min" if seconds < 3600 else f"Last {seconds / 3600:g} h"
+            embed.add_field(name=label, value=value, inline=False)
+        await ctx.send(embed=embed)
+    
+    async def export_history(self, ctx, fmt):
+        """Upload the poll history, or keep it as the data directory's single export file if it's too large.
+        
+        Uploaded exports are deleted afterwards, so repeated exports don't pile up on disk.
+        """
+        if fmt not in EXPORT_FORMATS:
+            return await ctx.send(f"❌ Export format must be one of: {', '.join(EXPORT_FORMATS)}")
+        if not len(self.engine.history):
+            return await ctx.send("❌ No poll history recorded yet.")
+        
+        data_dir = os.path.dirname(self.engine.state_path)
+        path = None
+        try:
+            os.makedirs(data_dir, exist_ok=True)
+            fd, path = tempfile.mkstemp(prefix="poll_history_", suffix=f".{fmt}", dir=data_dir)
+            os.close(fd)
+            rows = await self.engine.history.export(path, fmt)
+            size = os.path.getsize(path)
+            if size <= MAX_UPLOAD_BYTES:
+                with open(path, 'rb') as f:
+                    await ctx.send(f"✅ Exported {rows} poll records.",
+                                   file=discord.File(f, filename=f"poll_history_{int(time.time())}.{fmt}"))
+                return
+            # Too large to upload: replaces the previous export of this format
+            kept = os.path.join(data_dir, f"poll_history.{fmt}")
+            os.replace(path, kept)
+            path = None
+            await ctx.send(f"✅ Exported {rows} poll records to `{kept}` ({size / 1024 / 1024:.1f} MB, too large to upload).")
+        except OSError as e:
+            logger.error(f"Failed to export poll history: {e}")
+            await ctx.send("❌ Failed to write the poll history export.")
+        finally:
+            if path is not None:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
     
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def status(self, ctx):
         """Show the current status of the vanity sniper"""
-        if not self.target_vanity:
+        if not self.engine.watchlist:
             return await ctx.send("❌ No target vanity URL set.")
         
         embed = discord.Embed(title="Vanity Sniper Status", color=discord.Color.blue())
-        embed.add_field(name="Target Vanity", value=f"`{self.target_vanity}`", inline=False)
-        embed.add_field(name="Active", value=f"{'✅ Yes' if self.active else '❌ No'}", inline=True)
-        embed.add_field(name="Auto-Restart", value=f"{'✅ Yes' if self.auto_restart else '❌ No'}", inline=True)
+        embed.add_field(name="Active", value=f"{'✅ Yes' if self.engine.active else '❌ No'}", inline=True)
+        embed.add_field(name="Auto-Restart", value=f"{'✅ Yes' if self.engine.auto_restart else '❌ No'}", inline=True)
         
-        if self.active:
-            duration = time.time() - self.stats["start_time"]
+        if self.engine.active:
+            duration = time.time() - self.engine.stats["start_time"]
             check_interval = self.bot.config.get("check_interval", 0.5)
             
             embed.add_field(name="Running Time", value=f"{duration:.2f} seconds", inline=True)
             embed.add_field(name="Check Interval", value=f"{check_interval} seconds", inline=True)
-            embed.add_field(name="Attempts", value=str(self.stats["attempts"]), inline=True)
-            embed.add_field(name="Errors", value=str(self.stats["errors"]), inline=True)
+            if self.engine.scheduler.last_interval is not None:
+                embed.add_field(name="Paced Interval", value=f"{self.engine.scheduler.last_interval:.3f} seconds", inline=True)
+            embed.add_field(name="Attempts", value=str(self.engine.stats["attempts"]), inline=True)
+            embed.add_field(name="Errors", value=str(self.engine.stats["errors"]), inline=True)
+            supervisor = self.engine.supervisor.stats()
+            embed.add_field(
+                name="Supervisor",
+                value=f"{'Running' if supervisor['running'] else 'Stopped'}, "
+                      f"{supervisor['restarts']} restarts / {supervisor['crashes']} crashes",
+                inline=True
+            )
             
-            if self.rate_limit_remaining > 0:
-                embed.add_field(name="Rate Limit Status", value=f"{self.rate_limit_remaining} requests remaining", inline=False)
-        
+            buckets = self.engine.rate_limits.snapshot()
+            if buckets:
+                lines = [
+                    f"`{key}`: {info['remaining']}/{info['limit']} (resets in {info['reset_after']:.2f}s)"
+                    for key, info in buckets.items() if info["limit"] is not None
+                ]
+                if lines:
+                    embed.add_field(name="Rate Limit Status", value="\n".join(lines), inline=False)
+            
+            circuits = [
+                f"`{key}`: {info['state']}" + (f" ({info['open_for']:.1f}s left)" if info["open_for"] else "")
+                + (f", HTTP {info['fatal_status']}" if info["fatal_status"] else "")
+                for key, info in self.engine.breakers.snapshot().items() if info["state"] != CLOSED
+            ]
+            if circuits:
+                embed.add_field(name="Circuit Breakers", value="\n".join(circuits)[:1024], inline=False)
+        
+        lag = self.engine.watchdog.stats()
+        embed.add_field(
+            name="Event Loop",
+            value=f"{loop_implementation()} • Lag: {lag['last_ms']:.1f}ms "
+                  f"(recent max {lag['recent_max_ms']:.1f}ms) • Stalls: {lag['stalls']}",
+            inline=False
+        )
+        sync = self.engine.clock_sync.snapshot()
+        if sync["samples"]:
+            embed.add_field(
+                name="Clock Skew",
+                value=f"Discord is {sync['offset'] * 1000:+.0f}ms vs local (±{sync['uncertainty'] * 1000:.0f}ms, "
+                      f"{sync['samples']} samples)",
+                inline=False
+            )
+        if timeline.marks:
+            embed.add_field(name="Startup (since process start)", value=timeline.report()[:1024], inline=False)
+        
+        if self.engine.http_pool:
+            pool = self.engine.http_pool.stats()
+            embed.add_field(
+                name="Connection Pool",
+                value=f"Open: {pool['open']} • Idle: {pool['idle']} • Reused: {pool['reused']} • "
+                      f"Created: {pool['created']} • Reconnects: {pool['reconnects']}",
+                inline=False
+            )
+        
+        # Per-target stats, highest priority first, in whatever room the other fields leave
         guild_id = self.bot.config.get("guild_id")
+        channel_id = self.bot.config.get("notification_channel_id")
+        notify = self.engine.notifier.snapshot()
+        trailing = bool(guild_id) + bool(channel_id or notify["transport"] == "webhook")
+        room = MAX_EMBED_FIELDS - len(embed.fields) - trailing
+        targets = list(self.engine.watchlist)
+        shown = targets
+        if len(targets) > min(room, MAX_STATUS_TARGETS):
+            # Keep one field for the "+N more" line
+            shown = targets[:max(0, min(room - 1, MAX_STATUS_TARGETS))]
+        for target in shown:
+            if target.claimed:
+                detail = "✅ Claimed"
+            else:
+                owner = self.engine.detector.find_owner(target.code, self.bot.guilds)
+                detection = f"gateway ({owner.name})" if owner else "REST polling"
+                last = "never" if target.last_checked is None else f"{time.time() - target.last_checked:.1f}s ago"
+                guild_id = self.engine.claim_guild(target)
+                caps = self.engine.capabilities.get(guild_id) if guild_id else None
+                blocked = f"\n⛔ {caps.describe()}" if caps and caps.blocked else ""
+                detail = (f"Priority {target.priority} • {detection} • for {self.describe_guild(guild_id)}{blocked}\n"
+                          f"Checks: {target.checks} • Errors: {target.errors} • Attempts: {target.attempts}\n"
+                          f"Last check: {last}")
+            embed.add_field(name=f"`{target.code}`", value=detail, inline=False)
+        if len(shown) < len(targets):
+            embed.add_field(name=f"+{len(targets) - len(shown)} more", value="See `v!targets` for the full watchlist.",
+                            inline=False)
+        
         if guild_id:
             guild = self.bot.get_guild(guild_id)
-            embed.add_field(name="Target Server", value=f"{guild.name if guild else 'Unknown'} (ID: {guild_id})", inline=False)
+            embed.add_field(name="Default Target Server", value=f"{guild.name if guild else 'Unknown'} (ID: {guild_id})", inline=False)
             
-        channel_id = self.bot.config.get("notification_channel_id")
-        if channel_id:
-            channel = self.bot.get_channel(channel_id)
-            embed.add_field(name="Notification Channel", value=f"{channel.mention if channel else 'Unknown'}", inline=False)
+        if channel_id or notify["transport"] == "webhook":
+            channel = self.bot.get_channel(channel_id) if channel_id else None
+            via = "webhook" if notify["transport"] == "webhook" else "bot"
+            refused = f" (webhook refused: {notify['webhook_failed']})" if notify["webhook_failed"] else ""
+            embed.add_field(
+                name="Notification Channel",
+                value=f"{channel.mention if channel else 'Unknown' if channel_id else 'Webhook only'} via {via}{refused}\n"
+                      f"Queued: {notify['pending']} • Sent: {notify['sent']} • Coalesced: {notify['coalesced']} • "
+                      f"Retries: {notify['retries']} • Dropped: {notify['dropped']}",
+                inline=False
+            )
             
         embed.set_footer(text=f"Vanity Sniper v1.0 | Type v!help for commands")
         
         await ctx.send(embed=embed)
     
-    async def check_vanity_availability(self, vanity_code):
-        """Check if a vanity URL is available using the Public Invites API"""
-        try:
-            # Use cached rate limit info to avoid unnecessary requests
-            if time.time() < self.rate_limit_reset and self.rate_limit_remaining <= 0:
-                wait_time = self.rate_limit_reset - time.time()
-                logger.debug(f"Rate limit active, waiting {wait_time:.2f}s before checking")
-                await asyncio.sleep(max(0, wait_time))
-            
-            # Using the Public Invite API to check if a vanity exists
-            async with self.session.get(
-                f"https://discord.com/api/v10/invites/{vanity_code}",
-                headers=self.headers
-            ) as response:
-                # Update rate limit tracking
-                self.update_rate_limits(response)
-                
-                # 404 means the invite doesn't exist - which means the vanity is available
-                if response.status == 404:
-                    logger.info(f"Vanity {vanity_code} is available")
-                    return True
-                # 200 means the invite exists - the vanity is taken
-                elif response.status == 200:
-                    logger.debug(f"Vanity {vanity_code} is unavailable")
-                    return False
-                # 429 means we're rate limited
-                elif response.status == 429:
-                    retry_after = float(response.headers.get('Retry-After', 1))
-                    logger.warning(f"Rate limited during availability check, waiting {retry_after}s")
-                    await asyncio.sleep(retry_after)
-                    return None
-                else:
-                    # Other status code means we can't determine
-                    logger.error(f"Failed to check vanity availability: {response.status}")
-                    return None
-                    
-        except asyncio.TimeoutError:
-            logger.warning("Timeout while checking vanity availability")
-            return None
-        except Exception as e:
-            logger.error(f"Error checking vanity availability: {e}")
-            return None
-    
-    def update_rate_limits(self, response):
-        """Update the rate limit tracking from response headers"""
-        try:
-            if 'X-RateLimit-Remaining' in response.headers:
-                self.rate_limit_remaining = int(response.headers.get('X-RateLimit-Remaining', 0))
-            
-            if 'X-RateLimit-Reset' in response.headers:
-                self.rate_limit_reset = float(response.headers.get('X-RateLimit-Reset', 0))
-            elif 'Retry-After' in response.headers and response.status == 429:
-                self.rate_limit_reset = time.time() + float(response.headers.get('Retry-After', 1))
-                self.rate_limit_remaining = 0
-        except Exception as e:
-            logger.error(f"Error updating rate limits: {e}")
-    
-    async def attempt_set_vanity(self, guild_id, vanity_code):
-        """Try to set the vanity URL for the guild"""
-        try:
-            # Check rate limits before attempting
-            if time.time() < self.rate_limit_reset and self.rate_limit_remaining <= 0:
-                wait_time = self.rate_limit_reset - time.time()
-                logger.debug(f"Rate limit active, waiting {wait_time:.2f}s before setting vanity")
-                return {"success": False, "retry_after": wait_time}
-            
-            start_time = time.time()
-            
-            # Make request to update vanity URL
-            async with self.session.patch(
-                f"https://discord.com/api/v10/guilds/{guild_id}/vanity-url",
-                json={"code": vanity_code},
-                headers=self.headers,
-                timeout=5  # Add timeout to avoid hanging
-            ) as response:
-                elapsed = (time.time() - start_time) * 1000  # Convert to ms
-                
-                # Update rate limit tracking
-                self.update_rate_limits(response)
-                
-                # Log response for debugging
-                response_text = await response.text()
-                logger.debug(f"Set vanity response ({response.status}): {response_text}")
-                
-                if response.status == 200:
-                    # Success!
-                    logger.info(f"Successfully set vanity URL to {vanity_code} in {elapsed:.2f}ms")
-                    return {"success": True, "elapsed": elapsed}
-                
-                # Handle rate limits
-                elif response.status == 429:
-                    retry_after = float(response.headers.get('Retry-After', 1))
-                    logger.warning(f"Rate limited, waiting {retry_after}s before retrying")
-                    return {"success": False, "retry_after": retry_after}
-                
-                # URL is taken
-                elif response.status == 400:
-                    try:
-                        error_json = await response.json()
-                        if "code" in error_json and error_json.get("code") == 50020:
-                            logger.debug(f"Vanity {vanity_code} is still taken")
-                            return {"success": False, "reason": "taken"}
-                        else:
-                            logger.warning(f"Unexpected error when setting vanity: {error_json}")
-                            return {"success": False, "reason": "error", "details": error_json}
-                    except:
-                        return {"success": False, "reason": "error", "details": response_text}
-                
-                # Other errors
-                else:
-                    logger.error(f"Error when setting vanity (HTTP {response.status}): {response_text}")
-                    return {"success": False, "reason": "error", "status": response.status}
-        
-        except asyncio.TimeoutError:
-            logger.warning("Timeout during vanity set attempt")
-            return {"success": False, "reason": "timeout"}     
-        except Exception as e:
-            logger.error(f"Exception during vanity set attempt: {e}")
-            return {"success": False, "reason": "exception", "details": str(e)}
-    
-    async def verify_vanity_set(self, guild_id):
-        """Verify that the vanity URL has been successfully set"""
-        try:
-            async with self.session.get(
-                f"https://discord.com/api/v10/guilds/{guild_id}/vanity-url",
-                headers=self.headers,
-                timeout=5  # Add timeout to avoid hanging
-            ) as response:
-                # Update rate limit tracking
-                self.update_rate_limits(response)
-                
-                if response.status == 200:
-                    data = await response.json()
-                    current_vanity = data.get("code")
-                    return current_vanity == self.target_vanity
-                return False
-        except asyncio.TimeoutError:
-            logger.warning("Timeout during vanity verification")
-            return False
-        except Exception as e:
-            logger.error(f"Error verifying vanity: {e}")
-            return False
-    
-    async def adaptive_sleep(self, base_interval):
-        """Sleep with adaptive timing based on rate limit status"""
-        # If we're close to rate limit, increase sleep time
-        if self.rate_limit_remaining <= 5 and self.rate_limit_remaining > 0:
-            sleep_time = base_interval * 2
-        elif self.rate_limit_remaining == 0:
-            sleep_time = max(base_interval, 1)  # At least 1 second if rate limited
-        else:
-            sleep_time = base_interval
-            
-        # Ensure minimum delay to prevent hammering the API
-        await asyncio.sleep(max(sleep_time, self.min_check_interval))
-    
-    async def snipe_vanity(self):
-        """Main sniping logic - runs in background to continuously try setting the vanity URL"""
-        if not self.target_vanity:
-            logger.error("No target vanity set for sniping!")
-            return
-        
-        logger.info(f"Starting vanity sniper for code: {self.target_vanity}")
-        guild_id = self.bot.config["guild_id"]
-        check_interval = self.bot.config.get("check_interval", 0.5)
-        consecutive_errors = 0
-        
-        try:
-            while self.active and not self.successful_snipe:
-                try:
-                    # First check if the vanity is available
-                    is_available = await self.check_vanity_availability(self.target_vanity)
-                    
-                    if is_available is True:
-                        logger.info(f"Vanity {self.target_vanity} is available! Attempting to claim...")
-                        
-                        # Try to set the vanity URL immediately
-                        self.stats["attempts"] += 1
-                        result = await self.attempt_set_vanity(guild_id, self.target_vanity)
-                        
-                        if result["success"]:
-                            # Verify the change to make absolutely sure
-                            if await self.verify_vanity_set(guild_id):
-                                self.successful_snipe = True
-                                self.active = False
-                                
-                                # Save state after successful snipe
-                                await self.save_state()
-                                
-                                # Send success notification
-                                await self.send_success_notification(result["elapsed"])
-                                logger.info(f"Successfully sniped vanity URL: {self.target_vanity}")
-                                break
-                            else:
-                                logger.warning("Vanity appears set but verification failed. Continuing attempts.")
-                        
-                        # Handle rate limits with exact timing
-                        elif "retry_after" in result:
-                            retry_after = result["retry_after"]
-                            logger.info(f"Rate limited, waiting exactly {retry_after:.2f}s")
-                            await asyncio.sleep(retry_after)
-                            consecutive_errors = 0  # Reset error counter after controlled wait
-                        
-                        # If other error, log it and continue
-                        else:
-                            self.stats["errors"] += 1
-                            consecutive_errors += 1
-                    
-                    elif is_available is False:
-                        # Vanity not available, keep checking
-                        logger.debug(f"Vanity {self.target_vanity} is not available yet. Checking again soon.")
-                        consecutive_errors = 0  # Reset error counter on successful check
-                    
-                    elif is_available is None:
-                        # Error checking availability
-                        logger.warning("Error checking vanity availability. Will try again.")
-                        self.stats["errors"] += 1
-                        consecutive_errors += 1
-                    
-                    # Periodically update the state (every 50 attempts)
-                    if self.stats["attempts"] % 50 == 0:
-                        await self.save_state()
-                    
-                    # Implement exponential backoff for consecutive errors
-                    if consecutive_errors > 5:
-                        logger.warning(f"Multiple consecutive errors ({consecutive_errors}), increasing wait time")
-                        await asyncio.sleep(min(consecutive_errors, 10))  # Cap at 10 seconds
-                    else:
-                        # Sleep adaptively before next check
-                        await self.adaptive_sleep(check_interval)
-                
-                except asyncio.CancelledError:
-                    raise  # Re-raise to handle task cancellation
-                except Exception as e:
-                    logger.error(f"Unhandled exception in sniper loop: {e}")
-                    logger.error(traceback.format_exc())  # Log the full traceback
-                    self.stats["errors"] += 1
-                    consecutive_errors += 1
-                    await asyncio.sleep(1)  # Brief pause after errors
-                
-        except asyncio.CancelledError:
-            logger.info("Sniper task was cancelled")
-            # Save state on cancellation
-            await self.save_state()
-        except Exception as e:
-            logger.error(f"Unhandled exception in sniper task: {e}")
-            logger.error(traceback.format_exc())  # Log the full traceback
-            # Save state after crash
-            await self.save_state()
-            # Auto-restart if configured
-            if self.auto_restart:
-                logger.info("Auto-restarting sniper after error")
-                await asyncio.sleep(2)
-                self.snipe_task = asyncio.create_task(self.snipe_vanity())
-    
-    async def send_success_notification(self, elapsed_ms):
-        """Send notification that the vanity URL was successfully sniped"""
+    async def send_to_channel(self, payload):
+        """Deliver a queued notification to the notification channel; raising makes the dispatcher retry"""
         channel_id = self.bot.config.get("notification_channel_id")
-        if not channel_id:
-            logger.warning("No notification channel set, can't send success notification")
-            return
-        
-        channel = self.bot.get_channel(channel_id)
+        channel = self.bot.get_channel(channel_id) if channel_id else None
         if not channel:
-            logger.warning("Could not find notification channel")
+            logger.warning("No notification channel or webhook set, can't send notification")
             return
+        await channel.send(payload.get("content"),
+                           embeds=[discord.Embed.from_dict(embed) for embed in payload.get("embeds", ())])
+    
+    async def send_error_alert(self, reason, route, consequence, key=None):
+        """Queue an alert about an error the sniper can't recover from (``route`` may be None).
+        
+        Alerts with the same ``key`` (by default the route) replace each other while queued.
+        """
+        embed = discord.Embed(
+            title="⛔ Vanity Sniper Error",
+            description=f"{'Discord refused a request: ' if route else ''}{reason}.\n{consequence}",
+            color=discord.Color.red()
+        )
+        if route is not None:
+            embed.add_field(name="Route", value=f"`{route.key}`", inline=False)
+        embed.set_footer(text=f"Vanity Sniper • {discord.utils.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}")
+        if key is None and route is not None:
+            key = f"error-{route.key}"
+        self.engine.notifier.post({"embeds": [embed.to_dict()]}, ALERT, key=key)
+    
+    async def send_success_notification(self, vanity_code, elapsed_ms, verified=None, guild_id=None):
+        """Queue the notification that the vanity URL was successfully sniped.
         
+        If ``verified`` is given, the embed is prepared straight away but only
+        queued once that future resolves to True. It goes ahead of anything
+        else waiting in the notification queue.
+        """
         embed = discord.Embed(
             title="✅ Vanity URL Sniped!",
-            description=f"Successfully sniped the vanity URL: `{self.target_vanity}`",
+            description=f"Successfully sniped the vanity URL: `{vanity_code}`",
             color=discord.Color.green()
         )
+        if guild_id:
+            embed.add_field(name="Server", value=self.describe_guild(guild_id), inline=True)
         embed.add_field(name="Response Time", value=f"{elapsed_ms:.2f}ms", inline=True)
-        embed.add_field(name="Total Attempts", value=str(self.stats["attempts"]), inline=True)
+        embed.add_field(name="Total Attempts", value=str(self.engine.stats["attempts"]), inline=True)
         embed.set_footer(text=f"Vanity Sniper • {discord.utils.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}")
         
-        await channel.send("@everyone", embed=embed)
+        if verified is not None and not await verified:
+            return
+        self.engine.notifier.post({"content": "@everyone", "embeds": [embed.to_dict()]}, CRITICAL)
 
 async def setup(bot):
     await bot.add_cog(VanitySniper(bot)) 